@@ -0,0 +1,484 @@
+# Analysis Service Module
+# The data, graph and model pipeline of the application, without any GUI.
+# The Tkinter controller and the command-line tools both run through it
+
+from design_patterns import LinearRegressionStrategy, SGDRegressionStrategy, StrategyFactory, FinancialFactory, GraphFactory
+
+from ml_model import MLModelWithGraph
+
+# On-disk cache of the graph features and trained pipelines
+from artifact_cache import ArtifactCache
+
+# Winner of the last hyperparameter search, if any
+from model_registry import ModelRegistry
+
+# One model per ticker or per graph community
+from model_fleet import ModelFleet, evict_fleets
+
+# Optional engineered time-series features
+from feature_matrix import FEATURE_COLUMNS
+from time_series_features import TimeSeriesFeatures
+
+# Optional time-varying graph features
+from dynamic_graph import DynamicGraphFeatures
+
+# Correlation sums updated with the new days instead of recomputed
+from rolling_correlation import RollingCorrelation
+
+# Fitted models of every strategy used so far, for runtime switching
+from model_pool import ModelPool
+
+# Results of recent predictions
+from prediction_cache import PredictionCache
+
+# Timing spans of the stages (no-op unless enabled)
+from instrumentation import span
+
+import os
+import threading
+
+
+class AnalysisService:
+
+    # Constructor
+    # model_mode: "global" (one pooled model), "ticker" (one model per ticker)
+    #             or "cluster" (one model per community of the correlation graph)
+    # engineered_features: add the TimeSeriesFeatures columns to the model inputs
+    # graph_mode: "static" (one graph over the whole dataset) or "dynamic"
+    #             (monthly graphs from the past year, joined by as-of date)
+    # prediction_cache: PredictionCache of the prediction results (default: in memory only)
+    # max_models: fitted models of different strategies kept in memory for switching
+    # streaming_chunk_rows: train out of core, reading the price store in chunks
+    #                       of this many rows (MLModelWithGraph.train_model_streaming).
+    #                       The strategy must support partial_fit (default: SGD regression)
+    def __init__(self, csv_file="stocks_data_2020_2025.csv", strategy=None, cache=None, registry=None,
+                 model_mode="global", engineered_features=False, graph_mode="static",
+                 prediction_cache=None, max_models=4, streaming_chunk_rows=None):
+
+        if graph_mode not in ("static", "dynamic"):
+            raise ValueError("Invalid graph mode")
+
+        # The chunks hold the stored columns only, for the single global model
+        if streaming_chunk_rows and (model_mode != "global" or engineered_features):
+            raise ValueError("Streaming training needs the global model mode without engineered features.")
+        self.streaming_chunk_rows = streaming_chunk_rows
+
+        # Factory pattern implementation
+        self.processor = FinancialFactory.build_processor("stocks", csv_file)
+
+        # ML model strategy: the given one, else the registry winner,
+        # else the default one (Linear Regression)
+        registry = registry or ModelRegistry()
+        if streaming_chunk_rows:
+            self.current_strategy = strategy or SGDRegressionStrategy(random_state=0)
+        else:
+            self.current_strategy = strategy or registry.load_strategy() or LinearRegressionStrategy()
+
+        # Parameters of the graph features (part of their cache key)
+        self.graph_params = {"graph_type": "correlation", "threshold": 0.6, "mode": "exact"}
+        if graph_mode == "dynamic":
+            self.graph_params.update({"frequency": "MS", "lookback": "365D"})
+        self.graph_mode = graph_mode
+
+        # Warm starts reuse graph features and models computed from the same inputs
+        self.cache = cache or ArtifactCache()
+
+        # Engineered features, cached per ticker and only computed for new dates,
+        # in a cache of their own: they never evict the trained models
+        self.time_series = None
+        self.feature_columns = list(FEATURE_COLUMNS)
+        if engineered_features:
+            self.time_series = TimeSeriesFeatures(
+                cache=ArtifactCache(os.path.join(self.cache.cache_dir, "time_series_features")),
+                source=os.path.abspath(csv_file))
+            self.feature_columns += self.time_series.columns()
+
+        self.ml_model = MLModelWithGraph(self.current_strategy, self.feature_columns)
+
+        # Fitted models by strategy name, in memory or restored from the cache.
+        # The strategies built so far are kept, so the registry winner keeps its parameters
+        self.models = ModelPool(self.cache, max_models)
+        self._strategies = {self.current_strategy.name: self.current_strategy}
+
+        # Fleet of per-ticker/per-cluster models, used when model_mode is not "global"
+        self.model_mode = model_mode
+        self.fleet = None
+
+        # Predictions are reused while the data and the model are unchanged
+        self.predictions = prediction_cache or PredictionCache()
+
+        # Guards the state shared with the trainer thread (inputs, strategies,
+        # current model), which is replaced as a whole under it
+        self._lock = threading.Lock()
+
+        # The dataframes
+        self.df = None
+        self.graph_features_df = None
+        self.features_key = None # Cache key of graph_features_df
+        self.data_version = None # Version of the loaded data
+        self.model_version = None # Cache key of the trained model
+
+    # Load the data, build the graph features and train (or restore) the model
+    # progress(fraction, message) is called between the stages and
+    # on_tickers(tickers) as soon as the ticker list is known
+    def initialize(self, progress=None, on_tickers=None):
+
+        report = progress or (lambda fraction, message: None)
+
+        tickers = self.load_data(report)
+        if on_tickers:
+            on_tickers(tickers)
+
+        self.build_features(report)
+        self.train(report)
+
+        report(1.0, "Ready")
+        return tickers
+
+    # Load data and return the sorted tickers
+    def load_data(self, report=None):
+
+        report = report or (lambda fraction, message: None)
+
+        report(0.05, "Loading data...")
+        with span("load") as stage:
+            df = self.processor.data_load()
+            stage.set(rows=len(df), tickers=len(self.processor.ticker_index))
+
+        if self.time_series:
+            report(0.1, "Computing time-series features...")
+            with span("time_series_features", rows=len(df)):
+                # Added to the processor's frame, so the per-ticker slices carry them too
+                features = self.time_series.transform(df, self.processor.ticker_index)
+                for column in features.columns:
+                    df[column] = features[column]
+
+        # Published once complete
+        with self._lock:
+            self.df = df
+            self.data_version = self.processor.data_version()
+
+        return self.processor.tickers()
+
+    # Graph features, reused while the data and the graph parameters are unchanged
+    def build_features(self, report=None):
+
+        report = report or (lambda fraction, message: None)
+
+        features_key = ArtifactCache.make_key(
+            "graph_features", self.processor.data_version(), self.graph_params)
+        with span("graph_features_cache") as stage:
+            graph_features_df = self.cache.get(features_key)
+            stage.set(hit=graph_features_df is not None)
+
+        if graph_features_df is None and self.graph_mode == "dynamic":
+            report(0.2, "Building the monthly correlation graphs...")
+            with span("dynamic_graph", mode=self.graph_params["mode"]) as stage:
+                # Only the snapshots missing from the cache are built
+                dynamic = DynamicGraphFeatures(self.graph_params["frequency"], self.graph_params["lookback"],
+                                               self.graph_params["threshold"], self.graph_params["mode"],
+                                               cache=self.cache)
+                graph_features_df = dynamic.build(self.df)
+                stage.set(rows=len(graph_features_df))
+            self.cache.put(features_key, graph_features_df)
+
+        elif graph_features_df is None:
+            report(0.2, "Building the correlation graph...")
+            with span("graph", rows=len(self.df)) as stage:
+                # Build the graph from the entire dataset
+                graph = self._correlation_graph()
+                stage.set(nodes=graph.number_of_nodes(), edges=graph.number_of_edges())
+
+            # Extract graph features using Factory Pattern
+            report(0.4, "Extracting graph features...")
+            with span("features", mode=self.graph_params["mode"], nodes=graph.number_of_nodes()):
+                graph_features_df = GraphFactory.extract_features(graph, mode=self.graph_params["mode"])
+            self.cache.put(features_key, graph_features_df)
+
+        # Published together: the trainer thread reads them as a pair
+        with self._lock:
+            self.features_key, self.graph_features_df = features_key, graph_features_df
+
+    # Correlation graph of the entire dataset. The running sums of the
+    # RollingCorrelation engine are kept in the cache and only extended with
+    # the days appended since, so a refresh does not correlate the whole
+    # history again. A store rebuilt from another csv, or a changed ticker
+    # set, starts a new engine
+    def _correlation_graph(self):
+
+        if self.graph_params["graph_type"] != "correlation":
+            raise ValueError("Invalid graph type")
+
+        engine_key = ArtifactCache.make_key(
+            "rolling_correlation", self.processor.store.read_manifest().get("source"))
+        engine = self.cache.get(engine_key)
+
+        tickers = list(self.df["Ticker"].unique())
+        if engine is None or sorted(map(str, engine.tickers)) != sorted(map(str, tickers)) \
+                or engine.last_date > self.df["Date"].max():
+            with span("correlation_engine", rows=len(self.df)):
+                engine = RollingCorrelation.from_frame(self.df)
+            self.cache.put(engine_key, engine)
+        else:
+            with span("correlation_extend") as stage:
+                days = engine.extend(self.df)
+                stage.set(days=days)
+            if days:
+                self.cache.put(engine_key, engine)
+
+        return GraphFactory.build_rolling_graph(engine, threshold=self.graph_params["threshold"])
+
+    # Train the model, or restore it when it was trained on the same inputs
+    def train(self, report=None):
+
+        report = report or (lambda fraction, message: None)
+
+        model_key = self._model_key(self.ml_model, streaming=bool(self.streaming_chunk_rows))
+
+        # Results of another model are never asked for again: free them now
+        if model_key != self.model_version:
+            self.predictions.clear()
+        with self._lock:
+            self.model_version = model_key
+
+        if self.model_mode != "global":
+            self._train_fleet(model_key, report)
+            return
+
+        # Restored from the pool (memory or cache) when possible
+        fitted = self.models.get(self.current_strategy.name, model_key, self.ml_model)
+
+        with span("train", cached=fitted is not None) as stage:
+            if fitted is None:
+                # Train initial model
+                report(0.7, "Training the model...")
+                if self.streaming_chunk_rows:
+                    self.ml_model.train_model_streaming(
+                        lambda: self.processor.store.iter_chunks(self.streaming_chunk_rows), self.graph_features_df)
+                else:
+                    self.ml_model.train_model(self.df, self.graph_features_df)
+                self.models.put(self.current_strategy.name, model_key, self.ml_model)
+            else:
+                with self._lock:
+                    self.ml_model = fitted
+            stage.set(mae=self.ml_model.train_mae, r2=self.ml_model.train_r2)
+
+        # The model in use stays in memory while other strategies are trained
+        self.models.pin(self.current_strategy.name)
+
+    # Cache key of a trained model: the graph features it was trained on,
+    # the strategy's pipeline settings (and the settings of the engineered
+    # features, when used, and of the out-of-core training for the streamed model)
+    def _model_key(self, model, streaming=False):
+        key_parts = ["pipeline", self.features_key, model.pipeline_params()]
+        if self.time_series:
+            key_parts.append(self.time_series.params())
+        if streaming:
+            key_parts.append({"streaming_chunk_rows": self.streaming_chunk_rows})
+        return ArtifactCache.make_key(*key_parts)
+
+    # Names of the strategies the model can be switched to
+    @staticmethod
+    def strategies():
+        return list(StrategyFactory.strategies)
+
+    # New (unfitted) model of a strategy and its cache key; the caller holds the lock
+    def _new_model(self, name):
+
+        strategy = self._strategies.get(name)
+        if strategy is None:
+            strategy = self._strategies[name] = StrategyFactory.build_strategy(name)
+
+        model = MLModelWithGraph(strategy, self.feature_columns)
+        return model, self._model_key(model)
+
+    # Model of a strategy: (model key, new MLModelWithGraph, fitted model or None)
+    # The fitted model comes from memory, or from the cache when restore is True
+    def _pooled_model(self, name, restore=True):
+
+        with self._lock:
+            model, key = self._new_model(name)
+        return key, model, self.models.get(name, key, model if restore else None)
+
+    # Fit the model of a strategy (after initialize), unless it is in the pool already
+    # May run on another thread than the predictions: the frames and the
+    # model key are read together under the lock, and the frames are never
+    # modified once published (load_data and build_features replace them)
+    def train_strategy(self, name, report=None):
+
+        report = report or (lambda fraction, message: None)
+        self._check_global_mode()
+
+        with self._lock:
+            model, key = self._new_model(name)
+            df, graph_features_df = self.df, self.graph_features_df
+
+        fitted = self.models.get(name, key, model)
+        with span("train_strategy", strategy=name, cached=fitted is not None) as stage:
+            if fitted is None:
+                report(0.0, f"Training {name}...")
+                model.train_model(df, graph_features_df)
+                self.models.put(name, key, model)
+                fitted = model
+            stage.set(mae=fitted.train_mae, r2=fitted.train_r2)
+
+        report(1.0, f"{name} ready")
+        return fitted
+
+    # Restore from the cache the strategies trained in earlier sessions, so
+    # switching to them does not touch the disk. Nothing is trained here
+    # Returns the names of the strategies in memory
+    def warm_models(self, names=None, task=None):
+
+        self._check_global_mode()
+
+        names = names or [name for name in self.strategies() if name != self.current_strategy.name]
+        for name in names[:self.models.max_models - 1]:
+            if task:
+                task.check()
+            self._pooled_model(name)
+        return self.models.names()
+
+    # Switch the predictions to another strategy, in about a millisecond when
+    # its fitted model is in memory (e.g. from the Tk thread, with load False).
+    # Cached predictions of every model are kept, so switching back does not
+    # predict again. A prediction already running finishes with the old model
+    # Returns False (without switching) when the model is not in memory and
+    # load is False, else loads or trains it first (see train_strategy)
+    def use_strategy(self, name, load=True):
+
+        self._check_global_mode()
+
+        key, _, fitted = self._pooled_model(name, restore=load)
+        if fitted is None:
+            if not load:
+                return False
+            fitted = self.train_strategy(name)
+
+        with self._lock:
+            self.current_strategy = fitted.strategy
+            self.ml_model = fitted
+            self.model_version = key
+        self.models.pin(name)
+        return True
+
+    # Side-by-side predictions of early 2025 for one ticker by the fitted
+    # models of several strategies (default: every model in memory), one
+    # predict per model on a single feature matrix
+    # Returns (dates, real values, {strategy name: (predicted values, mae)})
+    def compare(self, ticker, names=None):
+
+        self._check_global_mode()
+
+        if names is None:
+            names = [name for name in self.strategies() if name in self.models]
+        pipelines = {}
+        for name in names:
+            _, _, fitted = self._pooled_model(name, restore=False)
+            if fitted is not None:
+                pipelines[name] = fitted.pipeline
+
+        df_ticker = self.processor.filtered_tickers(ticker)
+        with span("compare", ticker=ticker, models=len(pipelines)) as stage:
+            result = self.ml_model.compare_2025(df_ticker, self.graph_features_df, pipelines)
+            stage.set(rows=len(result[0]))
+        return result
+
+    # Switching and comparisons only apply to the single global model
+    def _check_global_mode(self):
+        if self.model_mode != "global":
+            raise ValueError("Strategy switching needs the global model mode.")
+
+    # Train the model fleet, or load it when it was trained on the same inputs
+    def _train_fleet(self, model_key, report):
+
+        fleet_dir = os.path.join(self.cache.cache_dir, f"fleet_{self.model_mode}_{model_key[:16]}")
+        self.fleet = ModelFleet(self.current_strategy, fleet_dir, group_by=self.model_mode,
+                                feature_columns=self.feature_columns)
+
+        # Fleets trained on older inputs are deleted beyond the last ones used
+        evict_fleets(self.cache.cache_dir, keep=fleet_dir)
+
+        if self.fleet.exists():
+            self.fleet.load()
+            return
+
+        report(0.7, "Training the model fleet...")
+        with span("train_fleet", mode=self.model_mode) as stage:
+            graph = None
+            if self.model_mode == "cluster":
+                graph = self._correlation_graph()
+            self.fleet.train(self.df, self.graph_features_df, graph)
+            stage.set(models=len(self.fleet.models))
+
+    # Prediction of early 2025 for one ticker: (dates, real values, predicted values, mae)
+    def predict(self, ticker):
+
+        # The model and its version are read together: the strategy may be switched meanwhile
+        with self._lock:
+            model, model_version = self.ml_model, self.model_version
+
+        key = self._prediction_key(ticker, model_version)
+        with span("prediction_cache", ticker=ticker) as stage:
+            result = self.predictions.get(key)
+            stage.set(hit=result is not None)
+        if result is not None:
+            return result
+
+        with span("filter", ticker=ticker) as stage:
+            df_ticker = self.processor.filtered_tickers(ticker)
+            stage.set(rows=len(df_ticker))
+
+        with span("predict", ticker=ticker) as stage:
+            # In fleet mode the request is routed to the model of the ticker's group
+            pipeline = self.fleet.pipeline_for(ticker) if self.fleet else None
+            result = model.predict_2025(df_ticker, self.graph_features_df, pipeline)
+            stage.set(rows=len(result[0]), mae=result[3])
+
+        self.predictions.put(key, result)
+        return result
+
+    # Fill the prediction cache for many tickers (all when tickers is None),
+    # e.g. in the background right after initialize
+    # The tickers are predicted batch_size at a time: with a task context the
+    # work stops between two batches as soon as the task is cancelled, and the
+    # batches already predicted stay cached
+    def precompute_predictions(self, tickers=None, task=None, batch_size=256):
+
+        tickers = tickers or self.processor.tickers()
+
+        # Room for the whole universe on top of the tickers browsed one by one
+        self.predictions.reserve(len(tickers) + self.predictions.base_entries)
+
+        with self._lock:
+            model, model_version = self.ml_model, self.model_version
+
+        pending = [ticker for ticker in tickers
+                   if self._prediction_key(ticker, model_version) not in self.predictions]
+
+        for start in range(0, len(pending), batch_size):
+            if task:
+                task.check()
+            batch = pending[start:start + batch_size]
+
+            # One batch prediction (one per group in fleet mode), split per ticker
+            with span("predict_batch", tickers=len(batch)) as stage:
+                results, mae = self.predict_batch(batch, model)
+                stage.set(rows=len(results))
+            for ticker, rows in results.groupby("Ticker", sort=False):
+                self.predictions.put(self._prediction_key(ticker, model_version),
+                                     (rows["Date"], rows["Close"], rows["Predicted"].to_numpy(),
+                                      float(mae[ticker])))
+
+        return len(pending)
+
+    def _prediction_key(self, ticker, model_version=None):
+        return PredictionCache.make_key(ticker, self.data_version, model_version or self.model_version)
+
+    # Predictions of early 2025 for many tickers (all when tickers is None)
+    # In fleet mode each group's model predicts the rows of its tickers
+    # model: MLModelWithGraph to use instead of the current one
+    def predict_batch(self, tickers=None, model=None):
+        if self.fleet:
+            return self.fleet.predict_batch(self.df, self.graph_features_df, tickers)
+        return (model or self.ml_model).predict_batch(self.df, self.graph_features_df, tickers)
@@ -0,0 +1,82 @@
+# Artifact Cache Module
+# Persistent content-addressed cache for expensive results (graph features,
+# fitted pipelines). Entries are keyed by a hash of everything they were
+# computed from and evicted least-recently-used first once over a size budget
+
+import hashlib # For content-addressed keys
+import json
+import os
+
+import joblib # Serialization of DataFrames and sklearn pipelines
+
+
+class ArtifactCache:
+
+    # Constructor
+    def __init__(self, cache_dir=".stock_cache", max_bytes=512 * 1024 ** 2):
+        self.cache_dir = cache_dir # Directory holding one file per entry
+        self.max_bytes = max_bytes # Size budget before evicting entries
+
+    # Hash of the parts an artifact depends on (data version, parameters...)
+    @staticmethod
+    def make_key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(json.dumps(part, sort_keys=True, default=repr).encode())
+        return digest.hexdigest()
+
+    # Return the cached value for the key, or None on a miss
+    def get(self, key):
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            value = joblib.load(path)
+        except Exception:
+            # Unreadable entries (interrupted write, library upgrade) are dropped
+            os.remove(path)
+            return None
+
+        # Accessing an entry moves it to the most recently used position
+        os.utime(path)
+        return value
+
+    # Whether an entry is stored for the key (without reading it)
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    # Store a value under the key, then evict old entries if over budget
+    def put(self, key, value):
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Write to a temporary file first so readers never see half an entry
+        path = self._path(key)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+
+        self._evict(keep=path)
+
+    # Remove least recently used entries until the cache fits the budget
+    def _evict(self, keep):
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".joblib"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, os.path.join(self.cache_dir, name)))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            # The entry just written is always kept
+            if path != keep:
+                os.remove(path)
+                total -= size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".joblib")
@@ -0,0 +1,165 @@
+# Walk-Forward Backtesting Module
+# Evaluates a strategy on a sequence of train/test folds ordered by date.
+# Each fold rebuilds the correlation graph features from the data available
+# before its test window only, so no future information leaks into training.
+# Folds are independent and run in parallel on a process pool
+#
+# Usage: python backtesting.py --mode rolling --train 730D --test 30D --step 30D
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Metric evaluations
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from design_patterns import FinancialFactory, GraphFactory, StrategyFactory
+from feature_matrix import FeatureMatrixBuilder
+
+
+class WalkForwardBacktester:
+
+    # Constructor
+    # mode: "expanding" (train on everything before the test window) or
+    #       "rolling" (train on the train_period before the test window)
+    # train_period, test_period, step: pandas offsets such as "365D" or "30D"
+    def __init__(self, strategy, mode="expanding", train_period="365D", test_period="30D",
+                 step=None, graph_params=None, workers=None):
+
+        if mode not in ("expanding", "rolling"):
+            raise ValueError("Invalid backtest mode")
+
+        self.strategy = strategy
+        self.mode = mode
+        self.train_period = pd.Timedelta(train_period)
+        self.test_period = pd.Timedelta(test_period)
+        self.step = pd.Timedelta(step) if step else self.test_period
+        self.graph_params = graph_params or {"graph_type": "correlation", "threshold": 0.6, "mode": "exact"}
+        self.workers = workers or os.cpu_count() or 1
+
+    # Fold boundaries: (train_start, test_start, test_end) with test_end excluded
+    def folds(self, dates):
+
+        first, last = dates.min(), dates.max()
+        folds = []
+
+        test_start = first + self.train_period
+        while test_start <= last:
+            test_end = min(test_start + self.test_period, last + pd.Timedelta(days=1))
+            train_start = first if self.mode == "expanding" else test_start - self.train_period
+            folds.append((train_start, test_start, test_end))
+            test_start += self.step
+
+        return folds
+
+    # Run every fold and return one row of metrics per fold
+    def run(self, df):
+
+        folds = self.folds(df["Date"])
+        if not folds:
+            raise ValueError("Not enough history for a single fold.")
+
+        # The data is sent once to each worker process, not once per fold
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_fold_worker,
+                                 initargs=(df, self.strategy, self.graph_params)) as pool:
+            rows = list(pool.map(_run_fold, folds))
+
+        results = pd.DataFrame(rows)
+        results.insert(0, "fold", range(len(results)))
+        return results
+
+
+#==================================#
+# Worker processes                 #
+#==================================#
+
+# Data shared by the folds run in a worker process
+_fold_data = {}
+
+
+def _init_fold_worker(df, strategy, graph_params):
+
+    # Sorted by date so each window is a binary search away
+    df = df.sort_values(by="Date", kind="stable", ignore_index=True)
+    _fold_data["df"] = df
+    _fold_data["dates"] = df["Date"].to_numpy()
+    _fold_data["strategy"] = strategy
+    _fold_data["graph_params"] = graph_params
+
+
+# Rows with start <= Date < end
+def _window(start, end):
+    dates = _fold_data["dates"]
+    first = np.searchsorted(dates, np.datetime64(start), side="left")
+    last = np.searchsorted(dates, np.datetime64(end), side="left")
+    return _fold_data["df"].iloc[first:last]
+
+
+# Train and evaluate one fold
+def _run_fold(fold):
+
+    train_start, test_start, test_end = fold
+    graph_params = _fold_data["graph_params"]
+
+    train_data = _window(train_start, test_start)
+    test_data = _window(test_start, test_end)
+
+    # Graph features from the training window only (no look-ahead)
+    graph = GraphFactory.build_graph(graph_params["graph_type"], train_data,
+                                     threshold=graph_params["threshold"])
+    # One process per fold already, no nested pool for the closeness
+    graph_features_df = GraphFactory.extract_features(graph, mode=graph_params["mode"], workers=1)
+
+    builder = FeatureMatrixBuilder()
+    X_train, y_train, _ = builder.build(train_data, graph_features_df)
+    X_test, y_test, _ = builder.build(test_data, graph_features_df)
+
+    row = {
+        "train_start": train_start, "test_start": test_start, "test_end": test_end,
+        "train_rows": len(X_train), "test_rows": len(X_test),
+        "MAE": np.nan, "MSE": np.nan, "R2": np.nan,
+    }
+    if len(X_train) == 0 or len(X_test) == 0:
+        return row
+
+    pipeline = _fold_data["strategy"].build_pipeline()
+    pipeline.fit(X_train, y_train)
+    y_pred = pipeline.predict(X_test)
+
+    row["MAE"] = mean_absolute_error(y_test, y_pred)
+    row["MSE"] = mean_squared_error(y_test, y_pred)
+    row["R2"] = r2_score(y_test, y_pred) if len(y_test) > 1 else np.nan
+    return row
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest")
+    parser.add_argument("--csv", default="stocks_data_2020_2025.csv", help="Stocks csv master file")
+    parser.add_argument("--strategy", choices=sorted(StrategyFactory.strategies), default="linear_regression")
+    parser.add_argument("--mode", choices=["expanding", "rolling"], default="expanding")
+    parser.add_argument("--train", default="365D", help="Initial/rolling train period")
+    parser.add_argument("--test", default="30D", help="Test period of each fold")
+    parser.add_argument("--step", default=None, help="Step between folds (default: test period)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="backtest_results.csv")
+    args = parser.parse_args()
+
+    df = FinancialFactory.build_processor("stocks", args.csv).data_load()
+
+    backtester = WalkForwardBacktester(StrategyFactory.build_strategy(args.strategy), mode=args.mode,
+                                       train_period=args.train, test_period=args.test,
+                                       step=args.step, workers=args.workers)
+    results = backtester.run(df)
+    results.to_csv(args.out, index=False)
+
+    print(results[["fold", "test_start", "MAE", "MSE", "R2"]].to_string(index=False))
+    print(f"\n{len(results)} folds, mean MAE {results['MAE'].mean():.4f}, mean R2 {results['R2'].mean():.4f}")
+    print("Results written to " + args.out)
+
+
+if __name__ == "__main__":
+    main()
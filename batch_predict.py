@@ -0,0 +1,43 @@
+# Scores the whole universe (or some tickers) without the GUI and writes
+# the early 2025 predictions and the MAE of each ticker to csv files
+#
+# Usage: python batch_predict.py
+#        python batch_predict.py --tickers AAPL MSFT --out results
+
+import argparse
+import os
+
+from analysis_service import AnalysisService
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Batch prediction of early 2025 prices")
+    parser.add_argument("--csv", default="stocks_data_2020_2025.csv", help="Stocks csv master file")
+    parser.add_argument("--tickers", nargs="*", help="Tickers to score (default: all)")
+    parser.add_argument("--out", default="predictions", help="Output directory")
+    parser.add_argument("--engineered-features", action="store_true",
+                        help="Add lagged returns, volatility, moving averages, RSI and volume z-scores")
+    parser.add_argument("--graph-mode", choices=["static", "dynamic"], default="static",
+                        help="One graph over the whole dataset, or monthly graphs from the past year")
+    parser.add_argument("--streaming-chunk-rows", type=int,
+                        help="Train an SGD model out of core on chunks of this many rows")
+    args = parser.parse_args()
+
+    service = AnalysisService(args.csv, engineered_features=args.engineered_features,
+                              graph_mode=args.graph_mode,
+                              streaming_chunk_rows=args.streaming_chunk_rows)
+    service.initialize()
+
+    results, mae = service.predict_batch(args.tickers or None)
+
+    os.makedirs(args.out, exist_ok=True)
+    results.to_csv(os.path.join(args.out, "predictions_2025.csv"), index=False)
+    mae.to_csv(os.path.join(args.out, "mae_2025.csv"))
+
+    print(f"{len(mae)} tickers scored, mean MAE {mae.mean():.4f}")
+    print("Results written to " + args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Benchmark of the graph feature extraction modes
+# Compares the exact centralities against the approximate/parallel mode
+# of GraphFactory.extract_features: speedup and rank-correlation error
+#
+# Usage: python benchmark_centrality.py --tickers 400 --days 750
+#        python benchmark_centrality.py --csv stocks_data_2020_2025.csv
+
+import argparse
+import time
+
+from design_patterns import GraphFactory
+from financial_filtering import StockDataProcessor
+from synthetic_data import synthetic_universe
+
+
+# Time one call of a function
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Exact vs approximate graph feature benchmark")
+    parser.add_argument("--csv", help="Use a stocks csv instead of synthetic prices")
+    parser.add_argument("--tickers", type=int, default=400)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--k", type=int, default=100, help="Sampled pivots for betweenness")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.csv:
+        df = StockDataProcessor(args.csv).data_load()
+    else:
+        df = synthetic_universe(args.tickers, args.days)
+
+    graph = GraphFactory.build_graph("correlation", df, threshold=args.threshold)
+    print(f"Graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+
+    exact, exact_time = timed(GraphFactory.extract_features, graph)
+    approximate, approximate_time = timed(GraphFactory.extract_features, graph,
+                                          mode="approximate", k=args.k, seed=args.seed,
+                                          workers=args.workers)
+
+    print(f"Exact:       {exact_time:.2f} s")
+    print(f"Approximate: {approximate_time:.2f} s (speedup x{exact_time / approximate_time:.1f})")
+
+    # Spearman rank correlation between exact and approximate values
+    for column in ("closeness", "betweenness"):
+        rank_corr = exact[column].corr(approximate[column], method="spearman")
+        max_error = (exact[column] - approximate[column]).abs().max()
+        print(f"{column:12} rank correlation {rank_corr:.4f}, max abs error {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
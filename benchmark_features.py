@@ -0,0 +1,106 @@
+# Benchmark of the model input construction
+# Compares the former merge + column selection of the price frame with the
+# graph features against the float32 FeatureMatrixBuilder: time and peak
+# memory of building the 2025 test matrix and the 2020-2024 train matrix
+#
+# Usage: python benchmark_features.py --tickers 500
+#        python benchmark_features.py --csv stocks_data_2020_2025.csv
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from feature_matrix import FEATURE_COLUMNS, FeatureMatrixBuilder
+from financial_filtering import StockDataProcessor
+from ingestion import FakeSource, normalize_history
+from ml_model import test_mask, train_mask
+
+
+# Synthetic OHLCV rows of the fake provider, with a categorical ticker like the store
+def synthetic_frame(tickers, start="2020-01-01", end="2025-06-01"):
+    symbols = [f"T{i:05d}" for i in range(tickers)]
+    df = normalize_history(FakeSource().fetch(symbols, start, end))
+    df["Ticker"] = df["Ticker"].astype("category")
+    return df
+
+
+# Random graph features for every ticker of df
+def random_graph_features(df, seed=0):
+    rng = np.random.default_rng(seed)
+    tickers = df["Ticker"].astype(str).unique()
+    return pd.DataFrame({
+        "Ticker": tickers,
+        "degree": rng.random(len(tickers)),
+        "closeness": rng.random(len(tickers)),
+        "betweenness": rng.random(len(tickers)),
+        "clustering": rng.random(len(tickers)),
+    })
+
+
+# The merge path the models used before the builder
+def merged_matrix(df, graph_features_df, mask):
+    merged = df[mask].merge(graph_features_df, on="Ticker")
+    return merged[FEATURE_COLUMNS].to_numpy(), merged["Close"].to_numpy()
+
+
+def built_matrix(df, graph_features_df, mask):
+    X, y, _ = FeatureMatrixBuilder().build(df, graph_features_df, mask)
+    return X, y
+
+
+# Best time and peak traced memory of a function over repeat runs
+def measure(function, *args, repeat=3):
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Merge vs feature matrix builder benchmark")
+    parser.add_argument("--csv", help="Use a stocks csv instead of synthetic prices")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.csv:
+        df = StockDataProcessor(args.csv).data_load()
+    else:
+        df = synthetic_frame(args.tickers)
+    graph_features_df = random_graph_features(df)
+    print(f"Rows: {len(df)}, tickers: {len(graph_features_df)}")
+
+    masks = {
+        "train": train_mask(df),
+        "test": test_mask(df),
+    }
+
+    for name, mask in masks.items():
+        merge_time, merge_peak = measure(merged_matrix, df, graph_features_df, mask, repeat=args.repeat)
+        build_time, build_peak = measure(built_matrix, df, graph_features_df, mask, repeat=args.repeat)
+
+        print(f"{name:5} merge:   {merge_time * 1000:8.1f} ms, peak {merge_peak / 2**20:7.1f} MiB")
+        print(f"{name:5} builder: {build_time * 1000:8.1f} ms, peak {build_peak / 2**20:7.1f} MiB "
+              f"(speedup x{merge_time / build_time:.1f}, memory x{merge_peak / max(build_peak, 1):.1f})")
+
+    # Same values up to the float32 rounding
+    X_merge, _ = merged_matrix(df, graph_features_df, masks["test"])
+    X_build, _ = built_matrix(df, graph_features_df, masks["test"])
+    print(f"Max relative difference: {np.max(np.abs(X_build - X_merge) / np.maximum(np.abs(X_merge), 1e-12)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
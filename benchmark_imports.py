@@ -0,0 +1,89 @@
+# Import-time benchmark of the application start-up
+# Runs "python -X importtime -c 'import main_project'" in a fresh interpreter
+# and reports the cost of importing the GUI entry point. It fails when the
+# heavy scientific stack is imported before the splash window. The import
+# time depends on the machine: it is only compared with a baseline recorded
+# locally with --update-baseline (not committed), when one exists
+#
+# Usage: python benchmark_imports.py
+#        python benchmark_imports.py --update-baseline
+#        python benchmark_imports.py --baseline import_baseline.json --tolerance 0.25
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules that must only be imported in the background, after the splash shows up
+DEFERRED_MODULES = ["pandas", "numpy", "sklearn", "networkx", "scipy", "matplotlib"]
+
+# Slowdowns below this are measurement noise (disk cache, other processes), never regressions
+ABSOLUTE_SLACK_MS = 30.0
+
+
+# Import main_project in a fresh interpreter and parse the -X importtime report
+# Returns {module: (self microseconds, cumulative microseconds)}
+def measure_imports(module="main_project"):
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here, capture_output=True, text=True, check=True)
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return timings
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Start-up import time benchmark")
+    parser.add_argument("--baseline", default="import_baseline.json", help="Baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs, the fastest one is kept")
+    args = parser.parse_args()
+
+    runs = [measure_imports() for _ in range(args.repeat)]
+    timings = min(runs, key=lambda run: run["main_project"][1])
+    total_ms = timings["main_project"][1] / 1000
+
+    print(f"import main_project: {total_ms:.1f} ms")
+    print("Slowest top-level imports:")
+    top_level = [(name, cumulative) for name, (_, cumulative) in timings.items() if "." not in name]
+    for name, cumulative in sorted(top_level, key=lambda item: -item[1])[:10]:
+        print(f"  {name:30} {cumulative / 1000:8.1f} ms")
+
+    failed = False
+
+    # The splash must not wait for the scientific stack
+    eager = [name for name in DEFERRED_MODULES if name in timings]
+    if eager:
+        print("FAIL: imported before the splash window: " + ", ".join(eager))
+        failed = True
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump({"main_project_ms": total_ms}, baseline_file, indent=1)
+        print("Baseline written to " + args.baseline)
+
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline_ms = json.load(baseline_file)["main_project_ms"]
+        limit_ms = max(baseline_ms * (1 + args.tolerance), baseline_ms + ABSOLUTE_SLACK_MS)
+        print(f"Baseline {baseline_ms:.1f} ms, limit {limit_ms:.1f} ms")
+        if total_ms > limit_ms:
+            print("FAIL: import time regression")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
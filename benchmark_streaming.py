@@ -0,0 +1,106 @@
+# Benchmark of the out-of-core training
+# Trains the in-memory LinearRegressionStrategy on the whole frame and the
+# SGDRegressionStrategy streamed chunk by chunk from the price store, then
+# compares their accuracy (validation and early 2025) and the peak memory
+# of the training. Only Date, Ticker and Close are loaded in full, for the
+# correlation graph
+#
+# Usage: python benchmark_streaming.py --tickers 500 --chunk-rows 100000
+#        python benchmark_streaming.py --csv stocks_data_2020_2025.csv
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from design_patterns import GraphFactory, LinearRegressionStrategy, SGDRegressionStrategy
+from financial_filtering import StockDataProcessor
+from ml_model import MLModelWithGraph, test_mask
+from synthetic_data import write_synthetic_csv
+
+
+# Run a function under tracemalloc: (seconds, peak MiB)
+def traced(function):
+
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak / 2 ** 20
+
+
+# Early 2025 MAE over the store, predicted chunk by chunk
+def streaming_test_mae(model, store, graph_features_df, chunk_rows):
+
+    abs_error, count = 0.0, 0
+    for chunk in store.iter_chunks(chunk_rows):
+        X, y, _ = model.feature_builder.build(chunk, graph_features_df, test_mask(chunk))
+        if len(X):
+            abs_error += np.abs(y - model.pipeline.predict(X)).sum()
+            count += len(X)
+
+    return abs_error / count
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="In-memory vs streaming training benchmark")
+    parser.add_argument("--csv", help="Use a stocks csv instead of a synthetic universe")
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--days", type=int, default=1300)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = None
+    csv_file = args.csv
+    if not csv_file:
+        workdir = tempfile.mkdtemp(prefix="benchmark_")
+        csv_file = os.path.join(workdir, "synthetic.csv")
+        write_synthetic_csv(csv_file, args.tickers, args.days)
+
+    try:
+        processor = StockDataProcessor(csv_file)
+        if not processor.store.is_fresh(csv_file):
+            processor.store.build_from_csv(csv_file)
+        store = processor.store
+
+        # The graph only needs the close prices
+        closes = store.load(columns=["Date", "Close"])
+        graph = GraphFactory.build_graph("correlation", closes)
+        graph_features_df = GraphFactory.extract_features(graph)
+        del closes
+
+        in_memory = MLModelWithGraph(LinearRegressionStrategy())
+        streaming = MLModelWithGraph(SGDRegressionStrategy(random_state=0))
+
+        # In memory: the whole frame is loaded and merged before the fit
+        in_memory_time, in_memory_peak = traced(
+            lambda: in_memory.train_model(store.load(), graph_features_df))
+
+        streaming_time, streaming_peak = traced(
+            lambda: streaming.train_model_streaming(lambda: store.iter_chunks(args.chunk_rows),
+                                                    graph_features_df, epochs=args.epochs))
+
+        print(f"\n{'':12} {'train s':>9} {'peak MiB':>9} {'val MAE':>9} {'val R2':>9} {'2025 MAE':>9}")
+        for name, model, seconds, peak in (("in-memory", in_memory, in_memory_time, in_memory_peak),
+                                           ("streaming", streaming, streaming_time, streaming_peak)):
+            test_mae = streaming_test_mae(model, store, graph_features_df, args.chunk_rows)
+            print(f"{name:12} {seconds:9.2f} {peak:9.1f} {model.train_mae:9.4f} {model.train_r2:9.5f} {test_mae:9.4f}")
+
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Benchmark suite of the analysis pipeline
+# Generates synthetic universes (synthetic_data.py) of several sizes and
+# times and memory-profiles every stage separately: the data load (cold:
+# csv parse and store build, warm: store only), filtered_tickers, the
+# correlation graph, the graph features, the training and predict_2025.
+# Results are written as JSON, and the run fails when a stage regresses
+# against a stored baseline
+#
+# Usage: python benchmark_suite.py --tickers 50 200 --days 1300
+#        python benchmark_suite.py --update-baseline
+#        python benchmark_suite.py --baseline benchmark_baseline.json --tolerance 0.25
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from design_patterns import GraphFactory, StrategyFactory
+from financial_filtering import StockDataProcessor
+from ml_model import MLModelWithGraph
+from synthetic_data import write_synthetic_csv
+
+# Differences below these are measurement noise, never regressions
+ABSOLUTE_SLACK = {"seconds": 0.02, "peak_mb": 1.0}
+
+
+# Best wall time of repeat calls of function, then its peak traced memory
+# on one more call. setup (optional) runs before every call, untimed
+def measure(function, repeat=3, setup=None):
+
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+# Time and memory of every stage on one synthetic universe
+def run_stages(tickers, days, workdir, strategy="linear_regression", feature_mode="exact", repeat=3):
+
+    csv_file = os.path.join(workdir, f"synthetic_{tickers}x{days}.csv")
+    write_synthetic_csv(csv_file, tickers, days)
+
+    processor = StockDataProcessor(csv_file)
+    store_dir = processor.store.store_dir
+
+    results = {}
+
+    # Cold load: the csv is parsed and the columnar store is built
+    results["data_load_cold"] = measure(
+        processor.data_load, repeat, setup=lambda: shutil.rmtree(store_dir, ignore_errors=True))
+
+    # Warm load: the store is fresh, only the memory-mapped columns are read
+    results["data_load_warm"] = measure(processor.data_load, repeat)
+    df = processor.data_load()
+    names = processor.tickers()
+
+    # Every ticker once (per-call cost = seconds / tickers)
+    results["filtered_tickers"] = measure(lambda: [processor.filtered_tickers(name) for name in names], repeat)
+
+    graph = GraphFactory.build_graph("correlation", df)
+    results["build_graph"] = measure(lambda: GraphFactory.build_graph("correlation", df), repeat)
+
+    graph_features_df = GraphFactory.extract_features(graph, mode=feature_mode)
+    results["extract_features"] = measure(
+        lambda: GraphFactory.extract_features(graph, mode=feature_mode), repeat)
+
+    model = MLModelWithGraph(StrategyFactory.build_strategy(strategy))
+    results["train_model"] = measure(lambda: model.train_model(df, graph_features_df), repeat)
+
+    # One ticker, as when a ticker is selected in the GUI
+    df_ticker = processor.filtered_tickers(names[0])
+    results["predict_2025"] = measure(lambda: model.predict_2025(df_ticker, graph_features_df), repeat)
+
+    return [{"tickers": tickers, "days": days, "stage": stage,
+             "seconds": seconds, "peak_mb": peak / 2 ** 20}
+            for stage, (seconds, peak) in results.items()]
+
+
+# Key of a result in the baseline file
+def result_key(result):
+    return f"{result['stage']}@{result['tickers']}x{result['days']}"
+
+
+# Results slower or larger than the baseline by more than the tolerance
+def regressions(results, baseline, tolerance):
+
+    failures = []
+    for result in results:
+        reference = baseline.get(result_key(result))
+        if reference is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            limit = max(reference[metric] * (1 + tolerance), reference[metric] + ABSOLUTE_SLACK[metric])
+            if result[metric] > limit:
+                failures.append(f"{result_key(result)} {metric}: "
+                                f"{result[metric]:.4g} > {reference[metric]:.4g} (+{tolerance:.0%})")
+    return failures
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark of every pipeline stage")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[50, 200], help="Universe sizes")
+    parser.add_argument("--days", type=int, default=1300, help="Business days of history, ending in May 2025")
+    parser.add_argument("--strategy", choices=sorted(StrategyFactory.strategies), default="linear_regression")
+    parser.add_argument("--feature-mode", choices=["exact", "approximate"], default="exact")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per stage, the fastest one is kept")
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="Baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="benchmark_")
+    results = []
+    try:
+        for tickers in args.tickers:
+            for result in run_stages(tickers, args.days, workdir, args.strategy, args.feature_mode, args.repeat):
+                results.append(result)
+                print(f"{result_key(result):35} {result['seconds'] * 1000:10.1f} ms {result['peak_mb']:9.1f} MiB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, "w") as out_file:
+        json.dump({"python": sys.version.split()[0], "machine": platform.machine(),
+                   "cpus": os.cpu_count(), "results": results}, out_file, indent=1)
+    print("Results written to " + args.out)
+
+    failed = False
+    if args.update_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump({result_key(result): {"seconds": result["seconds"], "peak_mb": result["peak_mb"]}
+                       for result in results}, baseline_file, indent=1)
+        print("Baseline written to " + args.baseline)
+
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            failures = regressions(results, json.load(baseline_file), args.tolerance)
+        for failure in failures:
+            print("FAIL: " + failure)
+        failed = bool(failures)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
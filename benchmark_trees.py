@@ -0,0 +1,83 @@
+# Benchmark of the tree strategies
+# Compares the current RandomForestStrategy (default forest behind a scaler)
+# with the TunedForestStrategy and the HistGradientBoostingStrategy: fit
+# time, predict latency (one ticker and the whole 2025 batch), pickled model
+# size and validation accuracy, on the same float32 feature matrix
+#
+# Usage: python benchmark_trees.py --tickers 100
+#        python benchmark_trees.py --csv stocks_data_2020_2025.csv
+
+import argparse
+import pickle
+import time
+
+import numpy as np
+
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from design_patterns import GraphFactory, StrategyFactory
+from feature_matrix import FeatureMatrixBuilder
+from financial_filtering import StockDataProcessor
+from synthetic_data import synthetic_universe
+
+# Strategies compared, the current one first
+STRATEGIES = ["random_forest", "tuned_forest", "hist_gradient_boosting"]
+
+
+# Best time of repeat calls of a function
+def best_time(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Tree strategies benchmark")
+    parser.add_argument("--csv", help="Use a stocks csv instead of a synthetic universe")
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--days", type=int, default=1300)
+    parser.add_argument("--strategies", nargs="*", choices=sorted(StrategyFactory.strategies), default=STRATEGIES)
+    args = parser.parse_args()
+
+    if args.csv:
+        df = StockDataProcessor(args.csv).data_load()
+    else:
+        df = synthetic_universe(args.tickers, args.days)
+        df["Ticker"] = df["Ticker"].astype("category")
+
+    graph_features_df = GraphFactory.extract_features(GraphFactory.build_graph("correlation", df))
+
+    # Same rows and split as MLModelWithGraph.train_model
+    builder = FeatureMatrixBuilder()
+    X, y, _ = builder.build(df, graph_features_df, df["Date"] < "2025-01-01")
+    split = len(X) - int(np.ceil(len(X) * 0.2))
+    X_train, X_test, y_train, y_test = X[:split], X[split:], y[:split], y[split:]
+
+    X_2025, _, rows = builder.build(df, graph_features_df, df["Date"] >= "2025-01-01")
+    first_ticker = df["Ticker"].to_numpy()[rows] == df["Ticker"].to_numpy()[rows[0]]
+    X_ticker = X_2025[first_ticker]
+    print(f"Train rows: {len(X_train)}, 2025 rows: {len(X_2025)}, rows of one ticker: {len(X_ticker)}\n")
+
+    print(f"{'strategy':24} {'fit s':>8} {'1 ticker ms':>12} {'batch ms':>10} {'size MiB':>9} {'val MAE':>9} {'val R2':>8}")
+    for name in args.strategies:
+        pipeline = StrategyFactory.build_strategy(name).build_pipeline()
+
+        start = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        ticker_time = best_time(lambda: pipeline.predict(X_ticker))
+        batch_time = best_time(lambda: pipeline.predict(X_2025), repeat=3)
+        size = len(pickle.dumps(pipeline)) / 2 ** 20
+
+        y_pred = pipeline.predict(X_test)
+        print(f"{name:24} {fit_time:8.2f} {ticker_time * 1000:12.2f} {batch_time * 1000:10.1f} {size:9.2f} "
+              f"{mean_absolute_error(y_test, y_pred):9.4f} {r2_score(y_test, y_pred):8.5f}")
+
+
+if __name__ == "__main__":
+    main()
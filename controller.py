@@ -1,11 +1,14 @@
 # controller/controller.py
 
-# Importing the main view class
+# Only lightweight modules are imported here so the splash window shows up
+# quickly. The main view (matplotlib) and the analysis service (pandas,
+# sklearn, networkx) are imported in the background while the splash is up
 
-from main_view import MainView
-from design_patterns import LinearRegressionStrategy, FinancialFactory, GraphFactory
+# Background thread for the slow work, so the Tk mainloop never blocks
+from task_runner import TaskRunner
 
-from ml_model import MLModelWithGraph
+# Timing spans of the stages (no-op unless STOCK_METRICS/STOCK_PROFILE is set)
+from instrumentation import span
 
 # Class that connects the tkinter GUI and the ML model training
 class Controller:
@@ -14,36 +17,50 @@ class Controller:
         self.parent = parent
         self.view = None
 
-        # Factory pattern implementation
-        self.processor = FinancialFactory.build_processor("stocks", "stocks_data_2020_2025.csv")
+        # Loading, graph features, training and predictions (created on first use)
+        self._service = None
 
-        # Default ML model strategy (Linear Regression)
-        self.current_strategy = LinearRegressionStrategy()
-        self.ml_model = MLModelWithGraph(self.current_strategy)
+        # Worker thread whose results are delivered back on the Tk thread
+        self.runner = TaskRunner(parent) if parent is not None else None
+        self.precompute_pending = False # The precompute task has not finished yet
 
-        # The dataframes
-        self.df = None
-        self.graph_features_df = None
+        # Second worker for the strategies trained on demand, so the
+        # predictions of the current model keep running meanwhile
+        self.trainer = TaskRunner(parent) if parent is not None else None
 
+        # Import the heavy modules and build the model while the splash is shown
+        if self.runner:
+            self.runner.submit("prewarm", self.prewarm)
 
-    # Method to initialize the app
-    def initialize(self):
-
-        # Load data
-        self.df = self.processor.data_load()
-
-        # Load tickers into the GUI
-        tickers = self.processor.tickers()
-        self.view.set_tickers(tickers)
+    # The analysis service, created (with the scientific stack) on first use
+    @property
+    def service(self):
+        if self._service is None:
+            from analysis_service import AnalysisService
+            self._service = AnalysisService("stocks_data_2020_2025.csv")
+        return self._service
 
-        # Build the graph from the entire dataset
-        graph = GraphFactory.build_graph("correlation", self.df)
+    # Background warm-up: import matplotlib and the Tk backend, then the
+    # service (pandas, sklearn, networkx) which also builds the pipeline
+    def prewarm(self, task=None):
+        import main_view
+        return self.service
 
-        # Extract graph features using Factory Pattern
-        self.graph_features_df = GraphFactory.extract_features(graph)
 
-        # Train initial model
-        self.ml_model.train_model(self.df, self.graph_features_df)
+    # Method to initialize the app
+    # Runs on the worker thread when a task context is given: progress is
+    # reported through it and the widgets are only touched via task.post
+    def initialize(self, task=None):
+
+        with span("initialize"):
+            if task:
+                self.service.initialize(progress=task.progress,
+                                        on_tickers=lambda tickers: task.post(self.view.set_tickers, tickers))
+                task.post(self.view.set_strategies, self.service.strategies(), self.service.current_strategy.name)
+            else:
+                # Load tickers into the GUI
+                self.service.initialize(on_tickers=self.view.set_tickers)
+                self.view.set_strategies(self.service.strategies(), self.service.current_strategy.name)
 
     # Method for the first and main view of the app
     def go_to_app(self):
@@ -52,23 +69,153 @@ class Controller:
             # Destroy the first view window
             self.view.destroy()
 
-        # from main_view import MainView
+        # Already imported by prewarm unless the button was clicked right away
+        from main_view import MainView
         self.view = MainView(self.parent, self)
 
         # Show the Main View
         self.view.pack(expand=True, fill="both")
 
-        # Initialize the project logic once access the main view
-        self.initialize()
+        # Initialize the project logic once access the main view,
+        # in the background while the view stays responsive
+        self.runner.submit("initialize", self.initialize,
+                           on_done=lambda result: self._on_initialized(),
+                           on_progress=self.view.show_progress,
+                           on_error=self.view.show_error)
+
+    # Once the model is ready: predict every ticker and load the models of the
+    # other strategies trained in earlier sessions, both in the background
+    def _on_initialized(self):
+        self.precompute()
+        self.trainer.submit("warm_models", lambda task: self.service.warm_models(task=task),
+                            on_error=self.view.show_error)
+
+    # Predict every ticker in the background once the model is ready,
+    # so browsing the listbox afterwards only reads the prediction cache
+    def precompute(self):
+        self.precompute_pending = True
+        self.runner.submit("precompute", lambda task: self.service.precompute_predictions(task=task),
+                           on_done=self._precompute_finished,
+                           on_error=self._precompute_failed)
+
+    def _precompute_finished(self, count):
+        self.precompute_pending = False
+
+    # A failed precompute is not submitted again by the next requests
+    def _precompute_failed(self, error):
+        self.precompute_pending = False
+        self.view.show_error(error)
+
+    # Switch the model to another strategy
+    # When its fitted model is in memory the switch is a pool lookup and a
+    # reference swap, done right here on the Tk thread (about a millisecond,
+    # never queued behind the worker); else it is loaded or trained on the
+    # trainer first. The other tickers are predicted on demand with the new
+    # model, so the cached predictions of the old one stay in the cache
+    def select_strategy(self, name):
+
+        try:
+            with span("switch_strategy", strategy=name) as stage:
+                switched = self.service.use_strategy(name, load=False)
+                stage.set(switched=switched)
+        except ValueError as error:
+            self.view.show_error(error)
+            return
+
+        if not switched:
+            self.train_strategy(name)
+            return
+
+        self.view.show_status(f"Model: {name}")
+
+        # Redraw the selected ticker with the new model
+        ticker = self.view.selected_ticker()
+        if ticker:
+            self.handle_prediction(ticker)
+
+    # Load or fit the model of a strategy on the trainer thread
+    def train_strategy(self, name):
+
+        self.view.show_status(f"Training {name} in the background...")
+        self.trainer.submit(f"train:{name}", lambda task: self.service.train_strategy(name, task.progress),
+                            on_done=lambda model: self._strategy_trained(name),
+                            on_progress=self.view.show_progress,
+                            on_error=self.view.show_error)
+
+    # Switch to the trained strategy unless another one was picked meanwhile
+    def _strategy_trained(self, name):
+
+        if self.view.selected_strategy() == name:
+            self.select_strategy(name)
+        else:
+            self.view.show_status(f"{name} ready")
 
     # Method that handles the prediction for each ticker
+    # A newer request replaces a prediction still pending for another ticker
     def handle_prediction(self, ticker):
 
-        df_ticker = self.processor.filtered_tickers(ticker)
+        self.view.show_status(f"Running prediction for {ticker}...")
+        self._submit_prediction(lambda task: self.predict(ticker, task), self._show_prediction)
 
-        # To obtain the prediction results
-        dates, real_values, predicted_values, mae = self.ml_model.predict_2025(df_ticker, self.graph_features_df)
+    # Submit a user request on the prediction channel
+    # A running precompute yields to it: it stops after its current batch
+    # and the remaining tickers are submitted again after the request
+    def _submit_prediction(self, work, on_done):
+
+        preempted = self.precompute_pending
+        if preempted:
+            self.runner.cancel("precompute")
 
-        # Send data to GUI for plotting
-        self.view.display_prediction_graph(
-            ticker, dates, real_values, predicted_values, mae)
+        self.runner.submit("prediction", work, on_done=on_done, on_error=self.view.show_error)
+
+        if preempted:
+            self.precompute()
+
+    # Drop a pending prediction (e.g. the user selected another ticker)
+    def cancel_prediction(self):
+        self.runner.cancel("prediction")
+
+    # Prediction for one ticker (runs on the worker thread)
+    def predict(self, ticker, task=None):
+
+        # Skip the work if another ticker was picked meanwhile
+        if task:
+            task.check()
+
+        # To obtain the prediction results
+        with span("handle_prediction", ticker=ticker):
+            dates, real_values, predicted_values, mae = self.service.predict(ticker)
+        return ticker, dates, real_values, predicted_values, mae
+
+    # Method that handles the side-by-side predictions of the trained models
+    # Shares the prediction channel: a newer request replaces a pending one
+    def handle_comparison(self, ticker):
+
+        self.view.show_status(f"Comparing the models on {ticker}...")
+        self._submit_prediction(lambda task: self.compare(ticker, task), self._show_comparison)
+
+    # Predictions of every model in memory for one ticker (runs on the worker thread)
+    def compare(self, ticker, task=None):
+
+        if task:
+            task.check()
+
+        with span("handle_comparison", ticker=ticker):
+            dates, real_values, predictions = self.service.compare(ticker)
+        return ticker, dates, real_values, predictions
+
+    def _show_comparison(self, result):
+        ticker, dates, real_values, predictions = result
+        with span("plot", ticker=ticker, rows=len(dates), models=len(predictions)):
+            self.view.display_comparison_graph(
+                ticker, dates, real_values, {name: values for name, (values, _) in predictions.items()})
+        self.view.show_status(f"{ticker}: " + ", ".join(
+            f"{name} MAE {mae:.2f}" for name, (_, mae) in predictions.items()))
+
+    # Send data to GUI for plotting
+    def _show_prediction(self, result):
+        ticker, dates, real_values, predicted_values, mae = result
+        with span("plot", ticker=ticker, rows=len(dates)):
+            self.view.display_prediction_graph(
+                ticker, dates, real_values, predicted_values, mae)
+        self.view.show_status(f"{ticker}: MAE {mae:.2f}")
@@ -3,17 +3,21 @@
 # and the Factory Pattern for data processors and graph creation
 
 from abc import ABC, abstractmethod # For abstract classes
+from concurrent.futures import ProcessPoolExecutor # Parallel closeness
+import os
 # Allow building ML pipelines
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression, SGDRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 
 # Importing the StockDataProcessor concrete class (Factory nuevo)
 from financial_filtering import StockDataProcessor
 
 import networkx as nx # For graph creation
+import numpy as np # Vectorized edge extraction
 import pandas as pd # Used for graph feature DataFrame
+from scipy import sparse # Optional sparse adjacency output
 
 #==================================#
 # Strategy Design Pattern          #
@@ -22,6 +26,13 @@ import pandas as pd # Used for graph feature DataFrame
 # Strategy Interface
 class MLStrategy(ABC):
 
+    # Name used by the StrategyFactory and the model registry
+    name = None
+
+    # Constructor: keyword arguments are passed to the model of the pipeline
+    def __init__(self, **model_params):
+        self.model_params = model_params
+
     # Abstract method that is overridden by each concrete strategy and returns a Pipeline object
     @abstractmethod
     def build_pipeline(self):
@@ -30,25 +41,102 @@ class MLStrategy(ABC):
 # Concrete Strategy 1: Linear Regression
 class LinearRegressionStrategy (MLStrategy):
 
+    name = "linear_regression"
+
     # Define a pipeline that applies scaling and uses Linear Regression
     def build_pipeline(self):
         # This pipeline always has a scaler followed by the chosen model
         return Pipeline([
             ("scaler", StandardScaler()), # Normalize feature ranges
-            ("model", LinearRegression()) # Actual ML algorithm
+            ("model", LinearRegression(**self.model_params)) # Actual ML algorithm
          ])
 
 # Concrete Strategy 2: Random Forest
 class RandomForestStrategy (MLStrategy):
 
+    name = "random_forest"
+
     # Another concrete strategy that allows switching the ML model to Random Forest
     # without changing other code
     def build_pipeline(self):
         return Pipeline([
             ("scaler", StandardScaler()),
-            ("model", RandomForestRegressor())
+            ("model", RandomForestRegressor(**self.model_params))
+        ])
+
+# Concrete Strategy 3: Random Forest tuned for speed and size
+class TunedForestStrategy (MLStrategy):
+
+    name = "tuned_forest"
+
+    # Trees are fitted on every core. Half as many trees, each grown on half
+    # of the rows (max_samples) with at least 2 rows per leaf, keep the
+    # validation MAE of the default forest (benchmark_trees.py) with a fit
+    # about 4x faster and a pickled model about 7x smaller. The given
+    # model_params override them
+    default_params = {"n_estimators": 50, "min_samples_leaf": 2, "max_samples": 0.5,
+                      "max_features": 1.0, "n_jobs": -1, "random_state": 0}
+
+    # No scaler: tree splits do not depend on the feature scale
+    # (the feature matrix is already float32, the dtype the trees use)
+    def build_pipeline(self):
+        return Pipeline([
+            ("model", RandomForestRegressor(**{**self.default_params, **self.model_params}))
+        ])
+
+# Concrete Strategy 4: Histogram-based Gradient Boosting
+class HistGradientBoostingStrategy (MLStrategy):
+
+    name = "hist_gradient_boosting"
+
+    # Features binned into histograms: fast multi-threaded fit, small model
+    default_params = {"max_iter": 300, "learning_rate": 0.1, "max_leaf_nodes": 31,
+                      "early_stopping": True, "random_state": 0}
+
+    def build_pipeline(self):
+        return Pipeline([
+            ("model", HistGradientBoostingRegressor(**{**self.default_params, **self.model_params}))
         ])
 
+# Concrete Strategy 5: Stochastic Gradient Descent regression
+class SGDRegressionStrategy (MLStrategy):
+
+    name = "sgd_regression"
+
+    # Scaler and model both support partial_fit, so this pipeline can also be
+    # trained chunk by chunk (MLModelWithGraph.train_model_streaming)
+    def build_pipeline(self):
+        return Pipeline([
+            ("scaler", StandardScaler()),
+            ("model", SGDRegressor(**self.model_params))
+        ])
+
+
+#==========================================#
+# Factory Pattern - ML Strategy            #
+#==========================================#
+
+# Factory responsible for creating a strategy from its name and model parameters
+class StrategyFactory:
+
+    # Available strategies by name
+    strategies = {
+        LinearRegressionStrategy.name: LinearRegressionStrategy,
+        RandomForestStrategy.name: RandomForestStrategy,
+        TunedForestStrategy.name: TunedForestStrategy,
+        HistGradientBoostingStrategy.name: HistGradientBoostingStrategy,
+        SGDRegressionStrategy.name: SGDRegressionStrategy,
+    }
+
+    @staticmethod
+    def build_strategy(name, **model_params):
+
+        if name in StrategyFactory.strategies:
+            return StrategyFactory.strategies[name](**model_params)
+
+        # If an unknown strategy, it raises the exception
+        raise ValueError("Invalid strategy")
+
 
 #==========================================#
 # Factory Pattern - Data Processor         #
@@ -78,58 +166,115 @@ class FinancialFactory:
 class GraphFactory:
 
     # Entry point for creating graphs
+    # window: only correlate the last window dates (e.g. 60 for a 60-day regime)
     @staticmethod
-    def build_graph(graph_type, df):
+    def build_graph(graph_type, df, threshold=0.6, window=None):
 
         # Determine what kind of graph should be built
         if graph_type == "correlation":
             # Delegate graph creation to private helper method
-            return GraphFactory._build_correlation_graph(df)
+            return GraphFactory._build_correlation_graph(df, threshold, window)
 
         # If an unknown type, it raises the exception
         else:
             raise ValueError("Invalid graph type")
 
+    # Up-to-date correlation graph from a RollingCorrelation engine,
+    # without rescanning the price history
+    @staticmethod
+    def build_rolling_graph(engine, threshold=0.6):
+        return GraphFactory._graph_from_correlation(engine.matrix(), threshold)
+
+    # Sparse (scipy CSR) weighted adjacency matrix of the correlation graph,
+    # returned with the tickers in row/column order
+    @staticmethod
+    def build_adjacency(df, threshold=0.6, window=None):
+
+        correlated = GraphFactory._correlation_matrix(df, window)
+        rows, cols, weights = GraphFactory._correlation_edges(correlated, threshold)
+
+        # Each undirected edge is stored in both directions
+        size = len(correlated.columns)
+        adjacency = sparse.coo_matrix(
+            (np.concatenate((weights, weights)),
+             (np.concatenate((rows, cols)), np.concatenate((cols, rows)))),
+            shape=(size, size)).tocsr()
+
+        return list(correlated.columns), adjacency
+
     # Build a correlation-based graph
     # Each node = a stock ticker
-    # An edge exists if correlation between tickers > 0.6
+    # An edge exists if correlation between tickers > threshold (0.6 by default)
+    @staticmethod
+    def _build_correlation_graph(df, threshold=0.6, window=None):
+        return GraphFactory._graph_from_correlation(GraphFactory._correlation_matrix(df, window), threshold)
+
+    # Graph of a correlation matrix
     @staticmethod
-    def _build_correlation_graph(df):
+    def _graph_from_correlation(correlated, threshold):
 
         graph = nx.Graph()
 
-        # Add one node for each unique stock ticker
-        tickers = df["Ticker"].unique()
-        for ticker in tickers:
-            graph.add_node(ticker)
+        # Add one node for each stock ticker
+        graph.add_nodes_from(correlated.columns)
+
+        rows, cols, weights = GraphFactory._correlation_edges(correlated, threshold)
+
+        # Add all edges between strongly correlated tickers at once
+        # Edge weight = correlation value
+        labels = correlated.columns.to_numpy()
+        graph.add_weighted_edges_from(zip(labels[rows].tolist(), labels[cols].tolist(), weights.tolist()))
+
+        return graph
+
+    # Correlation matrix between tickers (over the last window dates if given)
+    @staticmethod
+    def _correlation_matrix(df, window=None):
 
         # Pivot table: each column becomes a ticker, aligned by date
         pivot = df.pivot(index="Date", columns="Ticker", values="Close")
+        if window:
+            pivot = pivot.tail(window)
+        return pivot.corr()
 
-        # Correlation matrix between tickers
-        correlated = pivot.corr()
-
-        # Add edges between strongly correlated tickers
-        for i in correlated.columns:
-            for j in correlated.columns:
-                if i != j and correlated.loc[i, j] > 0.6:
-                    # Edge weight = correlation value
-                    graph.add_edge(i, j, weight=float(correlated.loc[i, j]))
+    # Edges of the correlation graph: pairs above the threshold, taken from
+    # the upper triangle only so each undirected edge appears once
+    @staticmethod
+    def _correlation_edges(correlated, threshold):
 
-        return graph
+        values = correlated.to_numpy()
+        # NaN correlations compare as False and never become edges
+        strong = np.triu(values > threshold, k=1)
+        rows, cols = np.nonzero(strong)
+        return rows, cols, values[rows, cols]
 
     # Compute graph features using Networkx: degree centrality, closeness, between, clustering
+    # mode="exact" computes every centrality exactly (slow on large dense graphs)
+    # mode="approximate" samples k pivot nodes for betweenness and splits the
+    # closeness computation by source node over a pool of worker processes
     @staticmethod
-    def extract_features(graph):
+    def extract_features(graph, mode="exact", k=100, seed=42, workers=None):
 
         # Number of strong connections
         degree = nx.degree_centrality(graph)
 
-        # influence based on distance
-        closeness = nx.closeness_centrality(graph)
+        if mode == "exact":
+            # influence based on distance
+            closeness = nx.closeness_centrality(graph)
 
-        # Bridge importance
-        betweenness = nx.betweenness_centrality(graph)
+            # Bridge importance
+            betweenness = nx.betweenness_centrality(graph)
+
+        elif mode == "approximate":
+            closeness = GraphFactory._parallel_closeness(graph, workers)
+
+            # Betweenness estimated from k sampled source nodes
+            betweenness = nx.betweenness_centrality(
+                graph, k=min(k, graph.number_of_nodes()), seed=seed)
+
+        # If an unknown mode, it raises the exception
+        else:
+            raise ValueError("Invalid feature mode")
 
         # Local connectivity density
         clustering = nx.clustering(graph)
@@ -141,4 +286,41 @@ class GraphFactory:
             "closeness": [closeness[t] for t in graph.nodes],
             "betweenness": [betweenness[t] for t in graph.nodes],
             "clustering": [clustering[t] for t in graph.nodes],
-        })
\ No newline at end of file
+        })
+
+    # Closeness centrality computed one source node at a time on a process pool
+    @staticmethod
+    def _parallel_closeness(graph, workers=None):
+
+        workers = workers or os.cpu_count() or 1
+        nodes = list(graph.nodes)
+
+        # Small graphs are not worth the cost of starting processes
+        if workers == 1 or len(nodes) < 2 * workers:
+            return nx.closeness_centrality(graph)
+
+        # A few chunks per worker keeps the pool balanced
+        chunk_count = workers * 4
+        chunks = [nodes[i::chunk_count] for i in range(chunk_count)]
+
+        closeness = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_graph_worker,
+                                 initargs=(graph,)) as pool:
+            for partial in pool.map(_closeness_chunk, chunks):
+                closeness.update(partial)
+
+        return closeness
+
+
+# Graph shared by the closeness worker processes (sent once per process)
+_worker_graph = None
+
+
+def _init_graph_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+# Closeness of a chunk of source nodes, computed inside a worker process
+def _closeness_chunk(nodes):
+    return {node: nx.closeness_centrality(_worker_graph, u=node) for node in nodes}
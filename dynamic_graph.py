@@ -0,0 +1,146 @@
+# Dynamic Graph Module
+# Time-varying graph features: the correlation graph and its centralities
+# are rebuilt on a schedule (e.g. at every month start) from the window of
+# prices before each snapshot date only, so no future information reaches
+# the rows they are attached to. Snapshots are built in parallel, cached one
+# by one (a refresh only builds the new ones) and returned as a (Date,
+# Ticker) table that the feature matrix joins by as-of date
+#
+# Usage: python dynamic_graph.py --frequency MS --lookback 365D --out graph_features.csv
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from design_patterns import FinancialFactory, GraphFactory
+from artifact_cache import ArtifactCache
+
+
+class DynamicGraphFeatures:
+
+    # Constructor
+    # frequency: pandas frequency of the snapshots ("MS" = every month start)
+    # lookback: window of prices before each snapshot the graph is built from
+    # cache: ArtifactCache holding every snapshot (None: no caching)
+    def __init__(self, frequency="MS", lookback="365D", threshold=0.6, mode="exact",
+                 workers=None, cache=None):
+
+        self.frequency = frequency
+        self.lookback = pd.Timedelta(lookback)
+        self.threshold = threshold
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+
+    # Settings of the snapshots, part of their cache keys
+    def params(self):
+        return {"frequency": self.frequency, "lookback": str(self.lookback),
+                "threshold": self.threshold, "mode": self.mode}
+
+    # Snapshot dates: every scheduled date with a full lookback of history before it
+    def schedule(self, dates):
+
+        first, last = dates.min(), dates.max()
+        return list(pd.date_range(first + self.lookback, last, freq=self.frequency))
+
+    # (Date, Ticker) table of graph features, sorted by Ticker then Date.
+    # A snapshot dated d is built from the rows with d - lookback <= Date < d
+    def build(self, df):
+
+        df = df.sort_values(by="Date", kind="stable", ignore_index=True)
+        dates = df["Date"].to_numpy()
+        close_sums = np.concatenate(([0.0], np.cumsum(df["Close"].to_numpy(dtype=np.float64))))
+
+        snapshots = {}
+        pending = [] # (snapshot date, key, first row, last row + 1)
+        for snapshot in self.schedule(df["Date"]):
+            first = int(np.searchsorted(dates, np.datetime64(snapshot - self.lookback), side="left"))
+            last = int(np.searchsorted(dates, np.datetime64(snapshot), side="left"))
+
+            # A snapshot is keyed by its window content, so appending new
+            # dates leaves the keys of the earlier snapshots unchanged
+            key = ArtifactCache.make_key("graph_snapshot", self.params(), str(snapshot),
+                                         last - first, float(close_sums[last] - close_sums[first]))
+            cached = self.cache.get(key) if self.cache else None
+
+            if cached is not None:
+                snapshots[snapshot] = cached
+            else:
+                pending.append((snapshot, key, first, last))
+
+        if pending:
+            # The data is sent once to each worker process, not once per snapshot
+            workers = min(self.workers, len(pending))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_snapshot_worker,
+                                     initargs=(df, self.threshold, self.mode)) as pool:
+                built = pool.map(_build_snapshot, [(first, last) for _, _, first, last in pending])
+
+                for (snapshot, key, _, _), features in zip(pending, built):
+                    snapshots[snapshot] = features
+                    if self.cache:
+                        self.cache.put(key, features)
+
+        frames = [features.assign(Date=snapshot) for snapshot, features in snapshots.items()
+                  if not features.empty]
+        if not frames:
+            raise ValueError("Not enough history for a single graph snapshot.")
+
+        table = pd.concat(frames, ignore_index=True)
+        table = table[["Date"] + [column for column in table.columns if column != "Date"]]
+        return table.sort_values(by=["Ticker", "Date"], ignore_index=True)
+
+
+#==================================#
+# Worker processes                 #
+#==================================#
+
+# Prices and graph settings of a snapshot worker process
+_snapshot_data = {}
+
+
+def _init_snapshot_worker(df, threshold, mode):
+    _snapshot_data["df"] = df
+    _snapshot_data["threshold"] = threshold
+    _snapshot_data["mode"] = mode
+
+
+# Graph features of the rows first:last (one snapshot window)
+def _build_snapshot(bounds):
+
+    first, last = bounds
+    window = _snapshot_data["df"].iloc[first:last]
+    if window["Date"].nunique() < 2:
+        return pd.DataFrame(columns=["Ticker", "degree", "closeness", "betweenness", "clustering"])
+
+    graph = GraphFactory.build_graph("correlation", window, threshold=_snapshot_data["threshold"])
+    # One process per snapshot already, no nested pool for the closeness
+    return GraphFactory.extract_features(graph, mode=_snapshot_data["mode"], workers=1)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Time-varying graph features")
+    parser.add_argument("--csv", default="stocks_data_2020_2025.csv", help="Stocks csv master file")
+    parser.add_argument("--frequency", default="MS", help="Snapshot frequency (pandas alias)")
+    parser.add_argument("--lookback", default="365D", help="Price window of each snapshot")
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--mode", choices=["exact", "approximate"], default="exact")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="graph_features.csv")
+    args = parser.parse_args()
+
+    df = FinancialFactory.build_processor("stocks", args.csv).data_load()
+
+    builder = DynamicGraphFeatures(args.frequency, args.lookback, args.threshold, args.mode,
+                                   workers=args.workers, cache=ArtifactCache())
+    table = builder.build(df)
+    table.to_csv(args.out, index=False)
+
+    print(f"{table['Date'].nunique()} snapshots, {len(table)} rows written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Feature Matrix Module
+# Builds the model input as one contiguous float32 NumPy array instead of
+# merging the graph features onto every row of the price frame. The graph
+# features are looked up by the categorical code of each row's ticker, so
+# no joined frame is ever materialised. The same builder is used for
+# training and inference, and the matrix can be written as a memory-mapped
+# .npy file. Time-varying graph features (a table with a Date column, one
+# snapshot per date and ticker) are joined by as-of date instead
+
+import numpy as np
+import pandas as pd
+
+# Variable that holds the model input columns: prices plus the Networkx features
+FEATURE_COLUMNS = ["Open", "High", "Low", "Volume",
+                   "degree", "closeness", "betweenness",
+                   "clustering"]
+
+
+class FeatureMatrixBuilder:
+
+    # Constructor
+    # Columns found in the price frame are read from it, the others from the graph features
+    def __init__(self, feature_columns=None, dtype=np.float32):
+        self.feature_columns = list(feature_columns or FEATURE_COLUMNS)
+        self.dtype = np.dtype(dtype)
+
+    # Build (X, y, rows) for the rows of df selected by mask (all rows when None)
+    # X: C-contiguous (rows, features) matrix, written to out_path (.npy) when given
+    # y: Close prices of the same rows, in float64 (the regression target keeps
+    #    its full precision, only the inputs use dtype)
+    # rows: positions in df of the rows of X (rows of tickers without graph
+    #       features are left out, like the inner join of a merge, and so are
+    #       rows with a missing value, e.g. before a rolling window is full)
+    def build(self, df, graph_features_df, mask=None, out_path=None):
+
+        rows = np.arange(len(df)) if mask is None else np.flatnonzero(np.asarray(mask))
+
+        graph_columns = [column for column in self.feature_columns if column not in df.columns]
+        if "Date" in graph_features_df.columns:
+            graph_rows = FeatureMatrixBuilder._asof_graph_rows(df["Ticker"], df["Date"], graph_features_df, rows)
+        else:
+            graph_rows = FeatureMatrixBuilder._graph_rows(df["Ticker"], graph_features_df, rows)
+
+        known = graph_rows >= 0
+        for column in self.feature_columns:
+            if column not in graph_columns:
+                known &= np.isfinite(df[column].to_numpy()[rows])
+        rows, graph_rows = rows[known], graph_rows[known]
+
+        shape = (len(rows), len(self.feature_columns))
+        if out_path:
+            X = np.lib.format.open_memmap(out_path, mode="w+", dtype=self.dtype, shape=shape)
+        else:
+            X = np.empty(shape, dtype=self.dtype)
+
+        # Filled column by column: only one column is ever converted at a time
+        graph_table = graph_features_df[graph_columns].to_numpy(dtype=self.dtype)
+        for position, column in enumerate(self.feature_columns):
+            if column in graph_columns:
+                X[:, position] = graph_table[graph_rows, graph_columns.index(column)]
+            else:
+                X[:, position] = df[column].to_numpy()[rows]
+
+        if out_path:
+            X.flush()
+
+        y = df["Close"].to_numpy()[rows].astype(np.float64)
+        return X, y, rows
+
+    # Row of graph_features_df matching the ticker of each selected row (-1
+    # when missing), computed once per ticker category and broadcast by code
+    @staticmethod
+    def _graph_rows(tickers, graph_features_df, rows):
+
+        codes, categories = FeatureMatrixBuilder._ticker_codes(tickers, rows)
+
+        graph_index = pd.Index(graph_features_df["Ticker"].astype(str))
+        position = np.append(graph_index.get_indexer(pd.Index(categories).astype(str)), -1)
+
+        # Code -1 (missing ticker) picks the -1 appended last
+        return position[codes]
+
+    # Latest snapshot of graph_features_df (Date, Ticker, features) dated on
+    # or before each selected row, for the row's ticker (-1 when none).
+    # One binary search over (ticker code, day) keys for all the rows
+    @staticmethod
+    def _asof_graph_rows(tickers, dates, graph_features_df, rows):
+
+        codes, categories = FeatureMatrixBuilder._ticker_codes(tickers, rows)
+        table_codes = pd.Index(categories).astype(str).get_indexer(graph_features_df["Ticker"].astype(str))
+
+        row_days = dates.to_numpy()[rows].astype("datetime64[D]").astype(np.int64)
+        table_days = graph_features_df["Date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        if len(row_days) == 0 or len(table_days) == 0:
+            return np.full(len(rows), -1)
+
+        base = min(row_days.min(), table_days.min())
+        span = max(row_days.max(), table_days.max()) - base + 1
+
+        table_keys = table_codes * span + (table_days - base)
+        order = np.argsort(table_keys, kind="stable")
+        found = np.searchsorted(table_keys[order], codes * span + (row_days - base), side="right") - 1
+
+        # The snapshot found must belong to the same ticker
+        graph_rows = np.full(len(rows), -1)
+        candidates = order[np.maximum(found, 0)]
+        same = (found >= 0) & (codes >= 0) & (table_codes[candidates] == codes)
+        graph_rows[same] = candidates[same]
+        return graph_rows
+
+    # Categorical codes of the selected rows' tickers and their categories
+    @staticmethod
+    def _ticker_codes(tickers, rows):
+
+        if isinstance(tickers.dtype, pd.CategoricalDtype):
+            return tickers.cat.codes.to_numpy().astype(np.int64)[rows], tickers.cat.categories
+
+        return pd.factorize(tickers.to_numpy()[rows])
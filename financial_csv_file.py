@@ -1,5 +1,16 @@
+# Downloads the price history of every ticker and creates the csv master
+# file together with the columnar store loaded by the application
+#
+# Usage: python financial_csv_file.py                 (full download)
+#        python financial_csv_file.py --incremental   (only the missing days)
+#        python financial_csv_file.py --fake          (offline fake provider)
+
+import argparse
+
 import pandas as pd
-from yahooquery import Ticker
+
+from ingestion import Downloader, FakeSource, YahooQuerySource, incremental_update, write_outputs
+from price_store import PriceStore
 
 # List of Tickers to include
 tickers = [
@@ -13,44 +24,42 @@ tickers = [
 start_date = "2020-01-01"
 end_date = "2025-05-01"
 
-# Dataframe
-df = pd.DataFrame()
+# CSV master file
+csv_file = "stocks_data_2020_2025.csv"
 
-print("Downloading data from Yahoo Finance...\n")
 
-# Iterate tickers and download
-for ticker in tickers:
-    print("Downloading " + ticker + "...\n")
+def main():
 
-    try:
-        stock = Ticker(ticker)
-        history = stock.history(start=start_date, end=end_date)
+    parser = argparse.ArgumentParser(description="Download the stock price history")
+    parser.add_argument("--fake", action="store_true", help="Use the offline fake provider")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append the days missing since the last download to the store")
+    args = parser.parse_args()
 
-        history = history.reset_index()
+    source = FakeSource() if args.fake else YahooQuerySource()
+    store = PriceStore.for_csv(csv_file)
 
-        history["Ticker"] = ticker
+    # Nightly refresh: only the days after each ticker's last stored date,
+    # appended to the store without rewriting the existing data
+    if args.incremental and store.exists():
+        until = (pd.Timestamp.today().normalize() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        appended = incremental_update(Downloader(source), store, tickers, start_date, until)
+        print(f"\n{appended} new rows appended to {store.store_dir}")
+        return
 
-        df = pd.concat([df, history], ignore_index=True)
+    print("Downloading data from Yahoo Finance...\n")
 
-    except Exception as e:
-        print(e)
+    # Concurrent batched download, concatenated once at the end
+    df, failed = Downloader(source).download(tickers, start_date, end_date)
 
-# Rename columns
-df = df.rename(columns={
-    "date": "Date",
-    "open": "Open",
-    "high": "High",
-    "low": "Low",
-    "close": "Close",
-    "adjclose": "Adj Close",
-    "volume": "Volume"
-})
+    if failed:
+        print("\nFailed tickers: " + ", ".join(failed))
 
-# Sort by date and ticker
-df = df.sort_values(by=["Ticker", "Date"])
+    # Write the csv and the store the application loads
+    write_outputs(df, store, csv_file)
+
+    print("\nCSV master file created: " + csv_file)
 
-# Load CSV master file
-csv_file = "stocks_data_2020_2025.csv"
-df.to_csv(csv_file, index=False)
 
-print("\nCSV master file created: " + csv_file)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 # This script loads the csv file data, cleans the data using pandas,
 # filters the company tickers, and the information by date
 
-# Importing pandas
+import numpy as np
 import pandas as pd
 
+# Binary store that replaces parsing the csv on every launch
+from price_store import PriceStore
+
 # For abstract classes
 from abc import ABC, abstractmethod
 
@@ -38,25 +41,65 @@ class StockDataProcessor(DataProcessor):
     # Constructor
     def __init__(self, path_csv):
         self.path_csv = path_csv # Store path to the csv file
+        self.store = PriceStore.for_csv(path_csv) # Columnar copy of the csv
         self.df = None # Hold database
+        self.ticker_index = {} # Ticker -> (first row, last row + 1)
 
-    # Read the file and load the data
+    # Load the data from the columnar store, the csv is only parsed
+    # again (and the store rebuilt) when the csv file changed
+    # Rows appended by an incremental refresh are compacted first, so the
+    # columns are memory maps of the store files
     def data_load(self):
-        self.df = pd.read_csv(self.path_csv)
-        # Converting dates to datetime format
-        self.df["Date"] = pd.to_datetime(self.df["Date"])
-        self.df = self.df.dropna(subset=["Date"]) # Filtered rows with invalid data
+        if not self.store.is_fresh(self.path_csv):
+            self.store.build_from_csv(self.path_csv)
+        elif self.store.has_appended_rows():
+            self.store.compact()
+
+        self.df = self.store.load()
+        self._build_index()
         return self.df # Returns the filtered data
 
-    def tickers(self):
+    # Version of the loaded data, used to key the cached results computed from it
+    def data_version(self):
+        return self.store.fingerprint()
+
+    # Build the per-ticker index once: a categorical Ticker column and
+    # the row offsets of each ticker in the frame sorted by (Ticker, Date)
+    def _build_index(self):
+
+        tickers = self.df["Ticker"]
+        if not isinstance(tickers.dtype, pd.CategoricalDtype) or \
+                not tickers.cat.categories.is_monotonic_increasing:
+            self.df = self.df.dropna(subset=["Ticker"])
+            names = sorted(pd.unique(self.df["Ticker"].astype(str)))
+            self.df["Ticker"] = pd.Categorical(self.df["Ticker"].astype(str), categories=names)
+
+        codes = self.df["Ticker"].cat.codes.to_numpy()
+        dates = self.df["Date"].to_numpy()
 
-        tickers = list(set(self.df["Ticker"])) # Converts tickers into a list
-        tickers.sort() # Sort the tickers
-        return tickers # Return the list of sorted tickers
+        # The store already returns sorted rows, anything else gets sorted once here
+        same_ticker = codes[1:] == codes[:-1]
+        if np.any(codes[1:] < codes[:-1]) or np.any(dates[1:][same_ticker] < dates[:-1][same_ticker]):
+            self.df = self.df.sort_values(by=["Ticker", "Date"], kind="stable", ignore_index=True)
+            codes = self.df["Ticker"].cat.codes.to_numpy()
+
+        categories = self.df["Ticker"].cat.categories
+        counts = np.bincount(codes, minlength=len(categories))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+
+        self.ticker_index = {
+            ticker: (int(bounds[i]), int(bounds[i + 1]))
+            for i, ticker in enumerate(categories) if counts[i]
+        }
+
+    def tickers(self):
+        # The index keys are already unique and sorted
+        return list(self.ticker_index)
 
     def filtered_tickers(self, ticker):
-        ticker_df = self.df[self.df["Ticker"] == ticker] # Filtered the rows by ticker name
-        return ticker_df.sort_values(by=["Date"]) # Sort the results by date
+        # Contiguous slice of the rows of one ticker, already sorted by date
+        start, stop = self.ticker_index.get(ticker, (0, 0))
+        return self.df.iloc[start:stop]
 
     def filtered_by_date(self, df, initial_date, end_date):
 
@@ -64,6 +107,12 @@ class StockDataProcessor(DataProcessor):
         if initial_date > end_date:
             raise ValueError("Initial date cannot be before end date.")
 
+        # Sorted dates (e.g. the slice of one ticker) are filtered by binary search
+        if df["Date"].is_monotonic_increasing:
+            start = df["Date"].searchsorted(pd.Timestamp(initial_date), side="left")
+            stop = df["Date"].searchsorted(pd.Timestamp(end_date), side="right")
+            return df.iloc[start:stop]
+
         # Filtering date
         df_filtered = df[(df["Date"] >= initial_date) & (df["Date"] <= end_date)]
-        return df_filtered
\ No newline at end of file
+        return df_filtered
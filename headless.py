@@ -0,0 +1,135 @@
+# Headless entry point: runs the analysis pipeline without Tkinter,
+# matplotlib or PIL, for servers with no display.
+# The model is warmed once (load, graph features, training or cache restore)
+# and then serves predictions from memory
+#
+# Usage: python headless.py predict AAPL MSFT
+#        python headless.py serve --port 8000
+#
+# HTTP endpoints (JSON):
+#   GET /health               status of the service
+#   GET /tickers              list of available tickers
+#   GET /predict?ticker=AAPL  early 2025 prediction of one ticker
+
+import argparse
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from analysis_service import AnalysisService
+
+
+# JSON-friendly prediction of one ticker
+def prediction_payload(service, ticker):
+
+    dates, real_values, predicted_values, mae = service.predict(ticker)
+    return {
+        "ticker": ticker,
+        "dates": [date.strftime("%Y-%m-%d") for date in dates],
+        "real": [float(value) for value in real_values],
+        "predicted": [float(value) for value in predicted_values],
+        "mae": float(mae),
+    }
+
+
+# Request handler bound to a warmed-up service
+def make_handler(service):
+
+    tickers = service.processor.tickers()
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            if url.path == "/health":
+                self._send(200, {"status": "ok", "tickers": len(tickers)})
+
+            elif url.path == "/tickers":
+                self._send(200, tickers)
+
+            elif url.path == "/predict":
+                ticker = query.get("ticker", [""])[0]
+                if ticker not in service.processor.ticker_index:
+                    self._send(404, {"error": f"Unknown ticker: {ticker}"})
+                    return
+                try:
+                    self._send(200, prediction_payload(service, ticker))
+                except ValueError as error:
+                    self._send(422, {"error": str(error)})
+
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return PredictionHandler
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Stock analysis without the GUI")
+    parser.add_argument("--csv", default="stocks_data_2020_2025.csv", help="Stocks csv master file")
+    parser.add_argument("--model-mode", choices=["global", "ticker", "cluster"], default="global",
+                        help="One pooled model, or one model per ticker / per graph community")
+    parser.add_argument("--engineered-features", action="store_true",
+                        help="Add lagged returns, volatility, moving averages, RSI and volume z-scores")
+    parser.add_argument("--graph-mode", choices=["static", "dynamic"], default="static",
+                        help="One graph over the whole dataset, or monthly graphs from the past year")
+    parser.add_argument("--streaming-chunk-rows", type=int,
+                        help="Train an SGD model out of core on chunks of this many rows")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    predict_parser = commands.add_parser("predict", help="Print the predictions of some tickers as JSON")
+    predict_parser.add_argument("tickers", nargs="+")
+
+    serve_parser = commands.add_parser("serve", help="Serve predictions over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+
+    args = parser.parse_args()
+
+    # Warm the model once
+    start = time.perf_counter()
+    service = AnalysisService(args.csv, model_mode=args.model_mode,
+                              engineered_features=args.engineered_features,
+                              graph_mode=args.graph_mode,
+                              streaming_chunk_rows=args.streaming_chunk_rows)
+    service.initialize(progress=lambda fraction, message: print(message))
+    print(f"Model ready in {time.perf_counter() - start:.2f} s")
+
+    if args.command == "predict":
+        # Same checks as /predict: one JSON error line per ticker that fails,
+        # and a non-zero exit status when any did
+        failed = False
+        for ticker in args.tickers:
+            if ticker not in service.processor.ticker_index:
+                payload, failed = {"ticker": ticker, "error": f"Unknown ticker: {ticker}"}, True
+            else:
+                try:
+                    payload = prediction_payload(service, ticker)
+                except ValueError as error:
+                    payload, failed = {"ticker": ticker, "error": str(error)}, True
+            print(json.dumps(payload))
+        sys.exit(1 if failed else 0)
+
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+        print(f"Serving on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
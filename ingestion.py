@@ -0,0 +1,210 @@
+# Ingestion Module
+# Downloads the price history of many tickers concurrently (bounded thread
+# pool, batched multi-symbol requests, retries with backoff) and writes the
+# result with a single concatenation straight to the columnar price store.
+# Sources are pluggable so the downloader can run offline on a fake provider
+
+import random
+import time
+import zlib # Stable per-symbol seeds for the fake source
+from abc import ABC, abstractmethod # For abstract classes
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceStore
+
+# Yahoo Finance column names -> names used by the application
+COLUMN_NAMES = {
+    "symbol": "Ticker",
+    "date": "Date",
+    "open": "Open",
+    "high": "High",
+    "low": "Low",
+    "close": "Close",
+    "adjclose": "Adj Close",
+    "volume": "Volume",
+}
+
+
+#==================================#
+# Price Sources                    #
+#==================================#
+
+# Source interface
+class PriceSource(ABC):
+
+    # Daily history of a batch of symbols between start (included) and
+    # end (excluded), one row per (symbol, date) with Yahoo column names
+    @abstractmethod
+    def fetch(self, symbols, start, end):
+        pass
+
+# Concrete Source 1: Yahoo Finance through yahooquery
+class YahooQuerySource(PriceSource):
+
+    def fetch(self, symbols, start, end):
+
+        # Only needed when actually downloading from Yahoo
+        from yahooquery import Ticker
+
+        history = Ticker(symbols).history(start=start, end=end)
+
+        # Partial failures come back as a dict of frames and error messages
+        if isinstance(history, dict):
+            frames = [frame for frame in history.values() if isinstance(frame, pd.DataFrame)]
+            if not frames:
+                raise RuntimeError(f"No history returned for {symbols}")
+            history = pd.concat(frames)
+
+        return history.reset_index()
+
+# Concrete Source 2: deterministic random walks, for offline runs and tests
+class FakeSource(PriceSource):
+
+    # Constructor
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency # Simulated request time in seconds
+        self.failure_rate = failure_rate # Probability that a request fails
+        self.random = random.Random(seed)
+
+    def fetch(self, symbols, start, end):
+
+        time.sleep(self.latency)
+        if self.random.random() < self.failure_rate:
+            raise ConnectionError("Simulated provider failure")
+
+        # Every symbol walks from the same origin, so a range fetched later
+        # continues the prices fetched before it
+        days = np.arange("2000-01-03", np.datetime64(end, "D"), dtype="datetime64[D]")
+        days = days[np.is_busday(days)]
+        in_range = days >= np.datetime64(start, "D")
+
+        frames = []
+        for symbol in symbols:
+            # The same symbol always yields the same prices
+            rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+            close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(days))))
+            open_ = close * (1 + rng.normal(0, 0.005, len(days)))
+            volume = rng.integers(1_000_000, 50_000_000, len(days))
+
+            history = pd.DataFrame({
+                "symbol": symbol,
+                "date": days.astype("datetime64[ns]"),
+                "open": open_,
+                "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, len(days))),
+                "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, len(days))),
+                "close": close,
+                "volume": volume,
+                "adjclose": close,
+            })
+            frames.append(history[in_range])
+
+        return pd.concat(frames, ignore_index=True)
+
+
+#==================================#
+# Downloader                       #
+#==================================#
+
+class Downloader:
+
+    # Constructor
+    def __init__(self, source, batch_size=50, max_workers=8, retries=3, backoff=1.0):
+        self.source = source # Where the prices come from
+        self.batch_size = batch_size # Symbols per request
+        self.max_workers = max_workers # Requests in flight at the same time
+        self.retries = retries # Extra attempts for a failed batch
+        self.backoff = backoff # First retry delay in seconds, doubled each time
+
+    # Download every ticker and return one frame sorted by (Ticker, Date)
+    # Returns the frame and the list of tickers that could not be downloaded
+    def download(self, tickers, start, end):
+
+        batches = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+
+        frames = []
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch_batch, batch, start, end): batch for batch in batches}
+
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    frames.append(future.result())
+                    print("Downloaded " + ", ".join(batch))
+                except Exception as e:
+                    print(e)
+                    failed.extend(batch)
+
+        # Single concatenation once every batch is in
+        if not frames:
+            return pd.DataFrame(columns=list(COLUMN_NAMES.values())), failed
+
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values(by=["Ticker", "Date"], ignore_index=True), failed
+
+    # Fetch one batch, retrying with exponential backoff (and jitter)
+    def _fetch_batch(self, batch, start, end):
+
+        for attempt in range(self.retries + 1):
+            try:
+                return normalize_history(self.source.fetch(batch, start, end))
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(1.0, 1.5))
+
+
+# Rename the provider columns and keep the day of each bar as a plain date
+def normalize_history(history):
+
+    df = history.rename(columns=COLUMN_NAMES)
+
+    # Yahoo mixes plain dates and timezone-aware timestamps, the day is what matters
+    df["Date"] = pd.to_datetime(df["Date"].astype(str).str[:10])
+    return df
+
+
+# Write a downloaded frame to the csv master file (optional) and the price store
+def write_outputs(df, store, csv_file=None):
+
+    source = None
+    if csv_file:
+        df.to_csv(csv_file, index=False)
+        # The store records the csv it matches, so it is not rebuilt from it
+        source = PriceStore.source_fingerprint(csv_file)
+
+    store.write(df, source)
+
+
+# Incremental refresh: fetch only the days after each ticker's watermark
+# (its last stored date) and append them to the store. Tickers not in the
+# store yet are fetched from start. Returns the number of rows appended
+def incremental_update(downloader, store, tickers, start, end):
+
+    watermarks = store.watermarks()
+
+    # Tickers sharing the same missing range are downloaded together
+    ranges = {}
+    for ticker in tickers:
+        if ticker in watermarks:
+            first_day = (watermarks[ticker] + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        else:
+            first_day = start
+        if pd.Timestamp(first_day) < pd.Timestamp(end):
+            ranges.setdefault(first_day, []).append(ticker)
+
+    frames = []
+    for first_day, group in ranges.items():
+        print(f"Updating {len(group)} tickers from {first_day}")
+        df, failed = downloader.download(group, first_day, end)
+        if failed:
+            print("Failed tickers: " + ", ".join(failed))
+        frames.append(df)
+
+    if not frames:
+        return 0
+
+    return store.append(pd.concat(frames, ignore_index=True))
@@ -0,0 +1,158 @@
+# Instrumentation Module
+# Timing spans around the stages of the application (load, graph, features,
+# train, predict, plot) with row counts and peak-memory deltas, exported as
+# JSON lines. Disabled by default: span() then returns a shared no-op object,
+# so the instrumented code pays one attribute check per stage
+#
+# Environment variables (read at import, or set with configure()):
+#   STOCK_METRICS=metrics.jsonl   append one JSON line per finished span
+#                                 ("-" writes them to stderr)
+#   STOCK_PROFILE=profiles        also run every top-level span under cProfile
+#                                 and dump a .prof file per span in that directory
+#                                 (pstats format: snakeviz, gprof2dot, pstats...)
+#
+# Sampling profilers such as py-spy need no hook: run them on the process
+#
+# Usage: with span("train", rows=len(df)) as stage:
+#            ...
+#            stage.set(mae=mae)
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+
+# Peak resident memory, not available on every platform (e.g. Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Current settings: where the spans go and where the profiles are dumped
+_settings = {"metrics": None, "profile_dir": None}
+_lock = threading.Lock()
+_local = threading.local() # Stack of the open spans of each thread
+
+
+# Enable, change or (with no arguments) disable the instrumentation
+def configure(metrics=None, profile_dir=None):
+    _settings["metrics"] = metrics
+    _settings["profile_dir"] = profile_dir
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+
+def enabled():
+    return _settings["metrics"] is not None or _settings["profile_dir"] is not None
+
+
+# Context manager timing a stage; fields (row counts...) are added to its record
+def span(name, **fields):
+    if _settings["metrics"] is None and _settings["profile_dir"] is None:
+        return _NULL_SPAN
+    return Span(name, fields)
+
+
+# High-water mark of the process resident memory in MiB (None when unknown)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class Span:
+
+    # Constructor
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.profiler = None
+
+    # Add fields to the record (e.g. the row count once it is known)
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+
+        # Only top-level spans are profiled: their profile covers the nested ones
+        if _settings["profile_dir"] and self.parent is None:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another thread's span is being profiled already
+                self.profiler = None
+
+        self.peak_before = peak_rss_mb()
+        self.started = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+
+        seconds = time.perf_counter() - self.start
+        _local.stack.pop()
+
+        if self.profiler:
+            self.profiler.disable()
+            file_name = f"{self.name}-{int(self.started * 1000)}-{threading.get_ident()}.prof"
+            self.profiler.dump_stats(os.path.join(_settings["profile_dir"], file_name))
+
+        record = {"span": self.name, "parent": self.parent, "thread": threading.current_thread().name,
+                  "start": self.started, "seconds": seconds}
+        peak_after = peak_rss_mb()
+        if peak_after is not None:
+            record["peak_rss_mb"] = peak_after
+            record["peak_rss_delta_mb"] = peak_after - self.peak_before
+        if error_type is not None:
+            record["error"] = error_type.__name__
+        record.update(self.fields)
+
+        _write(record)
+        return False
+
+
+# Shared span used while the instrumentation is disabled
+class _NullSpan:
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# Append a record to the metrics output (one JSON object per line)
+def _write(record):
+
+    metrics = _settings["metrics"]
+    if metrics is None:
+        return
+
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        if metrics == "-":
+            sys.stderr.write(line)
+        else:
+            with open(metrics, "a") as metrics_file:
+                metrics_file.write(line)
+
+
+configure(os.environ.get("STOCK_METRICS") or None, os.environ.get("STOCK_PROFILE") or None)
@@ -4,11 +4,8 @@ import tkinter as tk
 
 from tkinter import ttk
 
-# Use to implement the matplotlib graph into the GUI interface
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-# Use to create the graphs
-import matplotlib.pyplot as plt
+# Persistent matplotlib chart embedded in the GUI interface
+from prediction_chart import PredictionChart
 
 # Class for the main GUI Window
 
@@ -44,6 +41,26 @@ class MainView(tk.Frame):
         self.ticker_listbox.pack(side=tk.LEFT)
         scrollbar.config(command=self.ticker_listbox.yview)
 
+        # Picking another ticker drops the prediction still pending for the old one
+        self.ticker_listbox.bind("<<ListboxSelect>>", lambda event: self.controller.cancel_prediction())
+
+        # Strategy selector: the model can be switched at runtime
+        strategy_frame = tk.Frame(self, bg="palegreen")
+        strategy_frame.pack(pady=(10, 0))
+
+        tk.Label(strategy_frame, text="Model:", font=("Roboto", 13, "bold"), bg="palegreen",
+                 fg="black").pack(side=tk.LEFT, padx=5)
+
+        # Filled with the strategy names once the first model is ready
+        self.strategy_box = ttk.Combobox(strategy_frame, state="readonly", width=24, font=("Roboto", 12))
+        self.strategy_box.pack(side=tk.LEFT, padx=5)
+        self.strategy_box.bind("<<ComboboxSelected>>",
+                               lambda event: self.controller.select_strategy(self.strategy_box.get()))
+
+        # Button to compare the predictions of the trained models
+        tk.Button(strategy_frame, text="Compare Models", font=("Roboto", 11, "bold"), command=self.on_compare_models,
+                  bg="springgreen", fg="#000000").pack(side=tk.LEFT, padx=5)
+
         # GUI Buttons
         tk.Button(self, text="Run Prediction", font=("Roboto", 13, "bold"), command=self.on_run_prediction,
                   bg="#5fafda", fg="#000000", padx=5, pady=5).pack(pady=15)
@@ -52,10 +69,20 @@ class MainView(tk.Frame):
         tk.Button(self, text="Show Ticker Legend", font=("Roboto", 11, "bold"), command=self.ticker_legend,
                   bg="springgreen", fg="#000000").pack(pady=10)
 
+        # Progress of the background work (loading, training, predictions)
+        self.progress_bar = ttk.Progressbar(self, orient=tk.HORIZONTAL, length=300, mode="determinate", maximum=1.0)
+        self.progress_bar.pack(pady=2)
+
+        self.status_label = tk.Label(self, text="", font=("Roboto", 11), bg="palegreen", fg="black")
+        self.status_label.pack(pady=2)
+
         # Frame for Graph
         self.graph_frame = tk.Frame(self, bg="palegreen")
         self.graph_frame.pack(fill="x", pady=10)
 
+        # Created with the first prediction, then reused for every other one
+        self.chart = None
+
 
     # This method is used for the controller to set the company tickers
     def set_tickers(self, ticker_list):
@@ -75,63 +102,80 @@ class MainView(tk.Frame):
         if ticker_list:
             self.ticker_listbox.select_set(0)
 
-    # This method allows to read the selected ticker
+    # This method is used for the controller to set the strategies and the current one
+    def set_strategies(self, strategy_names, current):
+        self.strategy_box["values"] = strategy_names
+        self.strategy_box.set(current)
 
-    def on_run_prediction(self):
+    # Strategy currently selected in the combobox
+    def selected_strategy(self):
+        return self.strategy_box.get()
 
-        # To get a selection index
-        selection = self.ticker_listbox.curselection()
+    # Show the progress of the background work
+    def show_progress(self, fraction, message):
+        self.progress_bar["value"] = fraction
+        self.status_label.config(text=message, fg="black")
 
-        # Selection validation
+    # Show a short status message
+    def show_status(self, message):
+        self.status_label.config(text=message, fg="black")
 
-        if not selection:
-            return None # No selection
+    # Show an error raised by the background work
+    def show_error(self, error):
+        self.status_label.config(text=f"Error: {error}", fg="crimson")
 
-        # Get the ticker from the listbox
-        ticker = self.ticker_listbox.get(selection[0])
+    # This method allows to read the selected ticker
+
+    def on_run_prediction(self):
+
+        ticker = self.selected_ticker()
+        if ticker is None:
+            return None # No selection
 
         # Here we call the controller class
         self.controller.handle_prediction(ticker)
         return None
 
-    # This method shows the graph with the predictions
-    def display_prediction_graph(self, ticker, dates, real_values, predicted_values, mae):
+    # Compare the trained models on the selected ticker
+    def on_compare_models(self):
 
-        # Clear old graph
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
+        ticker = self.selected_ticker()
+        if ticker is None:
+            return None # No selection
 
-        # Create matplotlib figure
-        fig, ax = plt.subplots(figsize=(8, 3))
+        self.controller.handle_comparison(ticker)
+        return None
 
-        # Adding outer and inner background color to the graphs
-        fig.patch.set_facecolor("palegreen")
-        ax.set_facecolor("azure")
+    # Ticker selected in the listbox (None when there is no selection)
+    def selected_ticker(self):
 
-        # Plot real values
-        ax.plot(dates, real_values, label="Real Values (2025)", color="crimson")
+        # To get a selection index
+        selection = self.ticker_listbox.curselection()
+
+        # Selection validation
+        if not selection:
+            return None
 
-        # Plot predictions
-        ax.plot(dates, predicted_values, label="Predicted", color="mediumblue")
+        # Get the ticker from the listbox
+        return self.ticker_listbox.get(selection[0])
+
+    # This method shows the graph with the predictions
+    # The same figure and canvas are reused: only the line data is replaced
+    def display_prediction_graph(self, ticker, dates, real_values, predicted_values, mae):
 
-        plt.subplots_adjust(bottom=0.2)
+        if self.chart is None:
+            self.chart = PredictionChart(self.graph_frame)
 
-        # Added gridlines
-        ax.grid(True, linestyle="--", alpha=0.5, color="black")
+        self.chart.show(ticker, dates, real_values, predicted_values)
 
-        ax.set_title(f"Prediction Results for {ticker}", fontweight="bold")
-        ax.set_xlabel("Date", fontsize=12, fontweight="bold")
-        ax.set_ylabel("Close Price $", fontsize=12, fontweight="bold")
-        ax.legend(facecolor="springgreen", edgecolor="red") # Adds legend
+    # This method shows the predictions of several models side by side
+    # predictions: {strategy name: predicted values}
+    def display_comparison_graph(self, ticker, dates, real_values, predictions):
 
-        # Embed graph in Tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.graph_frame)
-        canvas.draw()
+        if self.chart is None:
+            self.chart = PredictionChart(self.graph_frame)
 
-        # Avoid stretching of the graph
-        canvas_length = canvas.get_tk_widget()
-        canvas_length.pack(pady=10)
-        canvas_length.configure(width=1100, height=300)
+        self.chart.show_comparison(ticker, dates, real_values, predictions)
 
     # Method for enabling a legend to identify each ticker with their respective company
     def ticker_legend(self):
@@ -6,21 +6,71 @@ from sklearn.model_selection import train_test_split
 # Metric evaluations
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
+import numpy as np
+import pandas as pd
+
+# float32 model input built without merging the graph features onto every row
+from feature_matrix import FeatureMatrixBuilder
+
+# Prediction window: the models are trained on the days before it (2020-2024)
+# and evaluated on its days (early 2025)
+TEST_START = "2025-01-01"
+TEST_END = "2025-05-31"
+
+
+# Rows of a frame before the prediction window
+def train_mask(df):
+    return df["Date"] < TEST_START
+
+
+# Rows of a frame inside the prediction window
+def test_mask(df):
+    return (df["Date"] >= TEST_START) & (df["Date"] <= TEST_END)
+
 class MLModelWithGraph:
 
     # Model Constructor
-    def __init__(self, strategy):
+    # feature_columns: model inputs (default: FEATURE_COLUMNS of feature_matrix)
+    def __init__(self, strategy, feature_columns=None):
         # Store the selected Strategy Pattern
         self.strategy = strategy
 
         # Build the correct ML pipeline from the strategy
         self.pipeline = self.strategy.build_pipeline()
 
+        # Same feature matrix layout for training and inference
+        self.feature_builder = FeatureMatrixBuilder(feature_columns)
+
         # Initialized train metrics
         self.train_mae = None
         self.train_mse = None
         self.train_r2 = None
 
+    # Settings of the pipeline, part of the cache key of a trained model
+    def pipeline_params(self):
+        params = {name: repr(value) for name, value in self.pipeline.get_params(deep=True).items()}
+        # A pipeline fitted on another feature layout is not reusable either
+        params["features"] = repr(self.feature_builder.feature_columns)
+        params["feature_dtype"] = self.feature_builder.dtype.str
+        params["target_dtype"] = np.dtype(np.float64).str
+        return params
+
+    # Fitted pipeline and its train metrics, as stored in the cache
+    def export_state(self):
+        return {
+            "pipeline": self.pipeline,
+            "train_mae": self.train_mae,
+            "train_mse": self.train_mse,
+            "train_r2": self.train_r2,
+        }
+
+    # Restore a previously trained pipeline instead of fitting again
+    def restore_state(self, state):
+        self.pipeline = state["pipeline"]
+        self.train_mae = state["train_mae"]
+        self.train_mse = state["train_mse"]
+        self.train_r2 = state["train_r2"]
+
     # Function use to build graph for correlated companies
     # It implements Networkx to convert the financial data
     # for each company ticker into a graph
@@ -30,23 +80,10 @@ class MLModelWithGraph:
     # Function that trains the model with data from: (2020-2024)
     def train_model(self, df, graph_features_df):
 
-        # This variable merges the stock data with the Networkx
-        # Graph features
-        merged = df.merge(graph_features_df, on="Ticker")
-
-        # Training the data from: (2020–2024)
-        train_data = merged[merged["Date"] < "2025-01-01"]
-
-        # X: Input features
+        # X: Input features (stock data with the Networkx graph features)
         # Y: Target variable
-
-        # Variable that holds the Networkx feature columns
-        feature_columns = ["Open", "High", "Low", "Volume",
-                           "degree", "closeness", "betweenness",
-                           "clustering"]
-
-        X = train_data[feature_columns]
-        y = train_data["Close"]
+        # Training the data from: (2020–2024)
+        X, y, _ = self.feature_builder.build(df, graph_features_df, train_mask(df))
 
         # Using train_test_split
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
@@ -72,34 +109,157 @@ class MLModelWithGraph:
         print("R2 Value:", self.train_r2)
 
 
-    # Function that predicts the early 2025 stock prices
-    def predict_2025(self, df, graph_features_df):
+    # Out-of-core version of train_model for histories larger than memory
+    # chunks: function returning a new iterator of price frames in (Ticker, Date)
+    #         order (e.g. lambda: store.iter_chunks(500_000)), read once per pass
+    # Every pipeline step must support partial_fit (e.g. SGDRegressionStrategy).
+    # The first pass fits the preprocessing, the next epochs passes fit the model
+    # and a last pass computes the metrics, on the same rows as train_model:
+    # the last 20% of the 2020-2024 rows are held out for validation
+    def train_model_streaming(self, chunks, graph_features_df, epochs=5):
 
-        merged = df.merge(graph_features_df, on="Ticker")
+        steps = [step for _, step in self.pipeline.steps]
+        if not all(hasattr(step, "partial_fit") for step in steps):
+            raise ValueError("Strategy does not support streaming training.")
+        preprocessing, model = steps[:-1], steps[-1]
 
-        # Date validation
+        def training_chunks():
+            for chunk in chunks():
+                X, y, _ = self.feature_builder.build(chunk, graph_features_df, train_mask(chunk))
+                if len(X):
+                    yield X, y
+
+        def preprocess(X):
+            for step in preprocessing:
+                X = step.transform(X)
+            return X
+
+        # Pass 1: preprocessing statistics (e.g. the running mean and variance
+        # of the StandardScaler) over the training rows, and their count
+        total = 0
+        for X, _ in training_chunks():
+            total += len(X)
+            for step in preprocessing:
+                step.partial_fit(X)
+                X = step.transform(X)
+
+        # Same split as train_test_split(test_size=0.2, shuffle=False)
+        split = total - int(np.ceil(total * 0.2))
+
+        # Passes over the training rows only
+        for _ in range(epochs):
+            position = 0
+            for X, y in training_chunks():
+                train_rows = max(0, min(len(X), split - position))
+                if train_rows:
+                    model.partial_fit(preprocess(X[:train_rows]), y[:train_rows])
+                position += len(X)
+
+        # Validation metrics accumulated chunk by chunk
+        position, count = 0, 0
+        abs_error, square_error, y_sum, y_square_sum = 0.0, 0.0, 0.0, 0.0
+        for X, y in training_chunks():
+            first = max(0, split - position)
+            position += len(X)
+            if first >= len(X):
+                continue
+            y_test = y[first:]
+            error = y_test - model.predict(preprocess(X[first:]))
+            count += len(y_test)
+            abs_error += np.abs(error).sum()
+            square_error += np.square(error).sum()
+            y_sum += y_test.sum()
+            y_square_sum += np.square(y_test).sum()
+
+        self.train_mae = abs_error / count
+        self.train_mse = square_error / count
+        self.train_r2 = 1 - square_error / (y_square_sum - y_sum ** 2 / count)
+
+        # Display the results: Visual only
 
-        test_data = merged[
-            (merged["Date"] >= "2025-01-01") &
-            (merged["Date"] <= "2025-05-31")
-        ]
+        print("The train metrics for the years 2020-2024 (streaming)")
+        print("MAE Value:", self.train_mae)
+        print("MSE Value:", self.train_mse)
+        print("R2 Value:", self.train_r2)
+
+    # Function that predicts the early 2025 stock prices
+    # pipeline: model to use instead of the trained one (e.g. from a model fleet)
+    def predict_2025(self, df, graph_features_df, pipeline=None):
+
+        # Date validation
+        X_test, _, rows = self.feature_builder.build(df, graph_features_df, test_mask(df))
 
         # Validation of data (just in case)
-        if test_data.empty:
+        if len(rows) == 0:
             raise ValueError("No data found for this year.")
 
-        X_test = test_data[["Open", "High", "Low", "Volume",
-                            "degree", "closeness", "betweenness",
-                            "clustering"]]
-
-        y_true = test_data["Close"]
-        dates = test_data["Date"]
+        y_true = df["Close"].iloc[rows]
+        dates = df["Date"].iloc[rows]
 
         # Applying Pipeline
-        values_predicted = self.pipeline.predict(X_test)
+        if pipeline is None:
+            pipeline = self.pipeline
+        values_predicted = pipeline.predict(X_test)
 
         # mae: Mean absolute error
         mae = mean_absolute_error(y_true, values_predicted)
 
         # Returns the values of the variables
-        return dates, y_true, values_predicted, mae
\ No newline at end of file
+        return dates, y_true, values_predicted, mae
+
+    # Function that predicts the early 2025 stock prices with several pipelines
+    # (e.g. the fitted models of different strategies) to compare them: the
+    # feature matrix is built once, then each pipeline predicts it in one call
+    # Returns the dates, the real values and {name: (predicted values, mae)}
+    def compare_2025(self, df, graph_features_df, pipelines):
+
+        # Date validation
+        X_test, _, rows = self.feature_builder.build(df, graph_features_df, test_mask(df))
+
+        # Validation of data (just in case)
+        if len(rows) == 0:
+            raise ValueError("No data found for this year.")
+
+        y_true = df["Close"].iloc[rows]
+        dates = df["Date"].iloc[rows]
+
+        predictions = {}
+        for name, pipeline in pipelines.items():
+            values_predicted = pipeline.predict(X_test)
+            predictions[name] = (values_predicted, mean_absolute_error(y_true, values_predicted))
+
+        return dates, y_true, predictions
+
+    # Function that predicts the early 2025 stock prices of many tickers at once
+    # (all of them when tickers is None): one feature matrix and one pipeline.predict
+    # over the stacked feature matrix, then the MAE of each ticker with a groupby
+    # Returns a frame (Ticker, Date, Close, Predicted) and the MAE per ticker
+    # predict: function(X, tickers of the rows) returning the predicted values,
+    #          instead of the trained pipeline (e.g. the models of a fleet)
+    def predict_batch(self, df, graph_features_df, tickers=None, predict=None):
+
+        if tickers is not None:
+            df = df[df["Ticker"].isin(tickers)]
+
+        X_test, _, rows = self.feature_builder.build(df, graph_features_df, test_mask(df))
+
+        # Validation of data (just in case)
+        if len(rows) == 0:
+            raise ValueError("No data found for this year.")
+
+        row_tickers = df["Ticker"].iloc[rows].astype(str).to_numpy()
+        if predict is None:
+            predict = lambda X, _: self.pipeline.predict(X)
+
+        results = pd.DataFrame({
+            "Ticker": row_tickers,
+            "Date": df["Date"].iloc[rows].to_numpy(),
+            "Close": df["Close"].iloc[rows].to_numpy(),
+            "Predicted": predict(X_test, row_tickers),
+        })
+
+        # mae: Mean absolute error of each ticker
+        errors = (results["Close"] - results["Predicted"]).abs()
+        mae = errors.groupby(results["Ticker"]).mean().rename("MAE")
+
+        return results, mae
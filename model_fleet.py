@@ -0,0 +1,248 @@
+# Model Fleet Module
+# Trains one pipeline per ticker (or per community of the correlation graph)
+# instead of a single pooled model. The groups are trained concurrently on a
+# process pool that reads the training arrays from shared memory, every fitted
+# pipeline is persisted, and predictions are routed to the right model in
+# O(1) with only the recently used models kept in memory
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from sklearn.metrics import mean_absolute_error
+
+# Caps the OpenMP/BLAS threads of the worker processes
+from threadpoolctl import threadpool_limits
+
+from feature_matrix import FeatureMatrixBuilder
+from ml_model import MLModelWithGraph, train_mask
+
+# File describing the groups and models of a fleet
+FLEET_MANIFEST = "fleet.json"
+
+
+class ModelFleet:
+
+    # Constructor
+    # group_by: "ticker" (one model per ticker) or "cluster" (one per graph community)
+    # max_loaded: pipelines kept in memory, the least recently used is dropped
+    # feature_columns: model inputs (default: FEATURE_COLUMNS of feature_matrix)
+    def __init__(self, strategy, fleet_dir, group_by="ticker", workers=None, max_loaded=32,
+                 feature_columns=None):
+
+        if group_by not in ("ticker", "cluster"):
+            raise ValueError("Invalid fleet grouping")
+
+        self.strategy = strategy
+        self.fleet_dir = fleet_dir
+        self.group_by = group_by
+        self.workers = workers or os.cpu_count() or 1
+        self.max_loaded = max_loaded
+        self.feature_columns = feature_columns
+
+        self.routes = {} # Ticker -> group
+        self.models = {} # Group -> model file and metrics
+        self._loaded = OrderedDict() # Group -> pipeline, least recently used first
+        self._lock = threading.Lock()
+
+    # Method that checks if a trained fleet was persisted to the directory
+    def exists(self):
+        return os.path.isfile(os.path.join(self.fleet_dir, FLEET_MANIFEST))
+
+    # Group of each ticker: the ticker itself, or its graph community
+    def assign_groups(self, tickers, graph=None):
+
+        if self.group_by == "ticker":
+            return {ticker: ticker for ticker in tickers}
+
+        communities = nx.community.louvain_communities(graph, weight="weight", seed=0)
+        routes = {}
+        for number, community in enumerate(sorted(communities, key=lambda c: sorted(c))):
+            for ticker in community:
+                routes[ticker] = f"cluster{number:03d}"
+        return routes
+
+    # Train one pipeline per group on the 2020-2024 data and persist the fleet
+    def train(self, df, graph_features_df, graph=None):
+
+        builder = FeatureMatrixBuilder(self.feature_columns)
+        X, y, rows = builder.build(df, graph_features_df, train_mask(df))
+
+        routes = self.assign_groups(graph_features_df["Ticker"], graph)
+        groups = df["Ticker"].iloc[rows].astype(str).map(routes)
+
+        # Rows of a group become contiguous: each worker reads one slice
+        order = np.lexsort((df["Date"].to_numpy()[rows], groups.to_numpy()))
+        group_values = groups.to_numpy()[order]
+        names, starts = np.unique(group_values, return_index=True)
+        stops = np.append(starts[1:], len(group_values))
+
+        os.makedirs(self.fleet_dir, exist_ok=True)
+
+        # Training arrays in shared memory (/dev/shm when available), mapped by every worker
+        shared_dir = tempfile.mkdtemp(dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        try:
+            X_path = os.path.join(shared_dir, "X.npy")
+            y_path = os.path.join(shared_dir, "y.npy")
+            np.save(X_path, X[order])
+            np.save(y_path, y[order])
+
+            tasks = [(str(name), int(start), int(stop)) for name, start, stop in zip(names, starts, stops)]
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_fleet_worker,
+                                     initargs=(X_path, y_path, self.strategy, self.fleet_dir,
+                                               max(1, (os.cpu_count() or 1) // self.workers))) as pool:
+                results = list(pool.map(_train_group, tasks, chunksize=max(1, len(tasks) // (self.workers * 4))))
+        finally:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+
+        self.models = {group: {"file": file_name, "rows": rows, "val_mae": mae}
+                       for group, file_name, rows, mae in results}
+        self.routes = {ticker: group for ticker, group in routes.items() if group in self.models}
+
+        # The manifest marks the fleet as trained: written through a temporary
+        # file so an interrupted write never leaves a partial one
+        manifest = {"group_by": self.group_by, "routes": self.routes, "models": self.models}
+        tmp_path = os.path.join(self.fleet_dir, f"{FLEET_MANIFEST}.tmp{os.getpid()}")
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(tmp_path, os.path.join(self.fleet_dir, FLEET_MANIFEST))
+
+        with self._lock:
+            self._loaded.clear()
+
+    # Load the routes of a persisted fleet (the models are loaded on demand)
+    def load(self):
+
+        manifest_path = os.path.join(self.fleet_dir, FLEET_MANIFEST)
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+
+        # Loading a fleet makes it the most recently used one (see evict_fleets)
+        os.utime(manifest_path)
+
+        self.group_by = manifest["group_by"]
+        self.routes = manifest["routes"]
+        self.models = manifest["models"]
+        with self._lock:
+            self._loaded.clear()
+
+    # Pipeline serving a ticker: dictionary routing, models loaded lazily (LRU)
+    def pipeline_for(self, ticker):
+
+        group = self.routes.get(ticker)
+        if group is None:
+            raise ValueError(f"No model trained for {ticker}.")
+
+        return self.pipeline_for_group(group)
+
+    # Pipeline of a group, loaded from the fleet directory on first use
+    def pipeline_for_group(self, group):
+
+        with self._lock:
+            if group in self._loaded:
+                self._loaded.move_to_end(group)
+                return self._loaded[group]
+
+        pipeline = joblib.load(os.path.join(self.fleet_dir, self.models[group]["file"]))
+
+        with self._lock:
+            self._loaded[group] = pipeline
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+
+        return pipeline
+
+    # Predictions of early 2025 for many tickers (all routed ones when tickers
+    # is None), through MLModelWithGraph.predict_batch with one predict per
+    # group on its rows of the stacked feature matrix
+    # Returns a frame (Ticker, Date, Close, Predicted) and the MAE per ticker
+    def predict_batch(self, df, graph_features_df, tickers=None):
+
+        tickers = list(self.routes) if tickers is None else tickers
+        model = MLModelWithGraph(self.strategy, self.feature_columns)
+        return model.predict_batch(df, graph_features_df, tickers, predict=self._predict_groups)
+
+    # Predicted values of stacked feature rows, each row by the model of its ticker's group
+    def _predict_groups(self, X, row_tickers):
+
+        groups = pd.Series(row_tickers).map(self.routes)
+        if groups.isna().any():
+            raise ValueError(f"No model trained for {row_tickers[groups.isna().to_numpy()][0]}.")
+
+        predicted = np.empty(len(X))
+        for group, positions in groups.groupby(groups, sort=False).indices.items():
+            predicted[positions] = self.pipeline_for_group(group).predict(X[positions])
+        return predicted
+
+
+# Delete the least recently used fleet directories (prefix*) of parent_dir
+# beyond max_fleets, so retrained fleets do not pile up on the disk.
+# Directories without a manifest (interrupted trainings) go first
+def evict_fleets(parent_dir, prefix="fleet_", max_fleets=2, keep=None):
+
+    if not os.path.isdir(parent_dir):
+        return
+
+    fleets = []
+    for name in os.listdir(parent_dir):
+        path = os.path.join(parent_dir, name)
+        if not name.startswith(prefix) or not os.path.isdir(path) or path == keep:
+            continue
+        manifest_path = os.path.join(path, FLEET_MANIFEST)
+        used = os.path.getmtime(manifest_path) if os.path.isfile(manifest_path) else 0
+        fleets.append((used, path))
+
+    # The kept fleet counts as one of the max_fleets
+    for _, path in sorted(fleets, reverse=True)[max(0, max_fleets - (keep is not None)):]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+#==================================#
+# Worker processes                 #
+#==================================#
+
+# Arrays and settings of a fleet worker process
+_fleet_data = {}
+
+
+def _init_fleet_worker(X_path, y_path, strategy, fleet_dir, threads):
+
+    # Memory-mapped: every worker reads the same physical pages
+    _fleet_data["X"] = np.load(X_path, mmap_mode="r")
+    _fleet_data["y"] = np.load(y_path, mmap_mode="r")
+    _fleet_data["strategy"] = strategy
+    _fleet_data["fleet_dir"] = fleet_dir
+
+    # The processes share the cores: each model uses its share of threads only
+    _fleet_data["thread_limits"] = threadpool_limits(limits=threads)
+    _fleet_data["threads"] = threads
+
+
+# Fit the pipeline of one group, validated on its latest 20% rows
+def _train_group(task):
+
+    group, start, stop = task
+    X = np.asarray(_fleet_data["X"][start:stop])
+    y = np.asarray(_fleet_data["y"][start:stop])
+
+    split = max(1, int(len(X) * 0.8))
+    pipeline = _fleet_data["strategy"].build_pipeline()
+    model = pipeline.steps[-1][1]
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=_fleet_data["threads"])
+    pipeline.fit(X[:split], y[:split])
+
+    mae = float(mean_absolute_error(y[split:], pipeline.predict(X[split:]))) if split < len(X) else None
+
+    file_name = f"{group}.joblib"
+    joblib.dump(pipeline, os.path.join(_fleet_data["fleet_dir"], file_name))
+    return group, file_name, len(X), mae
@@ -0,0 +1,83 @@
+# Model Pool Module
+# Fitted models of several strategies, so the application can switch the
+# strategy at runtime without training again. The most recently used models
+# stay in memory (switching to them only swaps a reference); every fitted
+# model is also stored in the ArtifactCache, so a model evicted from memory,
+# or trained in an earlier session, is loaded from the disk instead of
+# being fitted again. The model in use is pinned and never evicted
+
+import threading
+from collections import OrderedDict
+
+
+class ModelPool:
+
+    # Constructor
+    # cache: ArtifactCache holding the fitted models
+    # max_models: fitted models kept in memory at most (least recently used dropped)
+    def __init__(self, cache, max_models=4):
+        self.cache = cache
+        self.max_models = max_models
+        self._models = OrderedDict() # Strategy name -> (model key, MLModelWithGraph)
+        self.pinned = None # Strategy name of the model in use
+        self._lock = threading.Lock()
+
+    # Fitted model of a strategy for the model key, or None when it was never trained
+    # model: unfitted MLModelWithGraph of the strategy, restored from the cache
+    #        when the fitted model is not in memory
+    def get(self, name, key, model=None):
+
+        with self._lock:
+            if name in self._models and self._models[name][0] == key:
+                self._models.move_to_end(name)
+                return self._models[name][1]
+
+        if model is None:
+            return None
+
+        state = self.cache.get(key)
+        if state is None:
+            return None
+
+        model.restore_state(state)
+        self.put(name, key, model, store=False)
+        return model
+
+    # Add a fitted model; it is also written to the cache unless it was read from it
+    def put(self, name, key, model, store=True):
+
+        if store:
+            self.cache.put(key, model.export_state())
+
+        with self._lock:
+            self._models[name] = (key, model)
+            self._models.move_to_end(name)
+            self._evict()
+
+    # Keep the model of a strategy in memory whatever the other models used
+    def pin(self, name):
+        with self._lock:
+            self.pinned = name
+            self._evict()
+
+    # Drop the least recently used models past max_models, except the pinned one;
+    # the caller holds the lock
+    def _evict(self):
+        for name in list(self._models):
+            if len(self._models) <= self.max_models:
+                break
+            if name != self.pinned:
+                del self._models[name]
+
+    # Names of the strategies whose fitted model is in memory
+    def names(self):
+        with self._lock:
+            return list(self._models)
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
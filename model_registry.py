@@ -0,0 +1,62 @@
+# Model Registry Module
+# Records the winning strategy and model parameters of a search, so the
+# application builds that model at startup instead of the default one
+
+import json
+import os
+
+import pandas as pd
+
+from design_patterns import StrategyFactory
+
+# File holding the registry entries
+REGISTRY_FILE = "model_registry.json"
+
+
+class ModelRegistry:
+
+    # Constructor
+    def __init__(self, path=REGISTRY_FILE):
+        self.path = path
+
+    # Every recorded entry, oldest first
+    def entries(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as registry_file:
+            return json.load(registry_file)["entries"]
+
+    # Record a search result and return the entry
+    def record(self, strategy_name, model_params, score, metric="MAE", details=None):
+
+        entry = {
+            "strategy": strategy_name,
+            "params": model_params,
+            "score": float(score),
+            "metric": metric,
+            "recorded": pd.Timestamp.now().isoformat(),
+            "details": details or {},
+        }
+
+        entries = self.entries() + [entry]
+
+        # Written through a temporary file so the registry is replaced atomically
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as registry_file:
+            json.dump({"entries": entries}, registry_file, indent=1)
+        os.replace(tmp_path, self.path)
+
+        return entry
+
+    # Latest recorded winner, or None when nothing was recorded
+    def latest(self):
+        entries = self.entries()
+        return entries[-1] if entries else None
+
+    # Strategy of the latest winner, or None when nothing was recorded
+    def load_strategy(self):
+
+        entry = self.latest()
+        if entry is None:
+            return None
+        return StrategyFactory.build_strategy(entry["strategy"], **entry["params"])
@@ -0,0 +1,233 @@
+# Model Search Module
+# Parallel hyperparameter search across the MLStrategy implementations.
+# Candidates are scored with time-ordered cross-validation on the float32
+# feature matrix. The matrix is built once for the whole search, and the
+# preprocessing of each fold (e.g. the StandardScaler fit) is computed once
+# per worker and shared by every candidate that uses it
+#
+# Usage: python model_search.py
+#        python model_search.py --strategies random_forest --n-iter 10 --splits 5
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, TimeSeriesSplit
+
+# Caps the OpenMP/BLAS threads of the worker processes
+from threadpoolctl import threadpool_limits
+
+from design_patterns import StrategyFactory
+from feature_matrix import FeatureMatrixBuilder
+from ml_model import train_mask
+from model_registry import ModelRegistry
+
+# Default search space of each strategy (lists of values to try)
+DEFAULT_SPACES = {
+    "linear_regression": {
+        "fit_intercept": [True, False],
+        "positive": [False, True],
+    },
+    "random_forest": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 8, 16],
+        "min_samples_leaf": [1, 5, 20],
+        "max_features": [1.0, "sqrt"],
+    },
+    "tuned_forest": {
+        "n_estimators": [50, 100],
+        "min_samples_leaf": [1, 2, 5],
+        "max_samples": [0.5, None],
+    },
+    "hist_gradient_boosting": {
+        "learning_rate": [0.05, 0.1],
+        "max_leaf_nodes": [15, 31, 63],
+        "l2_regularization": [0.0, 1.0],
+    },
+    "sgd_regression": {
+        "alpha": [1e-6, 1e-4],
+        "learning_rate": ["invscaling", "adaptive"],
+        "eta0": [0.001, 0.01],
+    },
+}
+
+
+class ParameterSearch:
+
+    # Constructor
+    # spaces: {strategy name: {parameter: list of values or distribution}}
+    # n_iter: None for the full grid, or random candidates per strategy
+    def __init__(self, spaces=None, n_iter=None, n_splits=5, workers=None, seed=0):
+        self.spaces = spaces or DEFAULT_SPACES
+        self.n_iter = n_iter
+        self.n_splits = n_splits
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+
+    # Candidate (strategy name, parameters) pairs
+    def candidates(self):
+
+        candidates = []
+        for name, space in self.spaces.items():
+            if self.n_iter is None:
+                sampled = ParameterGrid(space)
+            else:
+                sampled = ParameterSampler(space, n_iter=self.n_iter, random_state=self.seed)
+
+            # numpy scalars drawn from distributions are stored as plain values
+            for params in sampled:
+                candidates.append((name, {key: getattr(value, "item", lambda: value)()
+                                          for key, value in params.items()}))
+        return candidates
+
+    # Fold boundaries on rows sorted by date: (end of train rows, end of
+    # validation rows). Splitting on dates keeps each day on one side only
+    def folds(self, dates):
+
+        unique_dates = np.unique(dates)
+        folds = []
+        for train_index, validation_index in TimeSeriesSplit(n_splits=self.n_splits).split(unique_dates):
+            train_end = np.searchsorted(dates, unique_dates[validation_index[0]], side="left")
+            validation_end = np.searchsorted(dates, unique_dates[validation_index[-1]], side="right")
+            folds.append((int(train_end), int(validation_end)))
+        return folds
+
+    # Score every candidate on the training years (2020-2024)
+    # Returns one row per candidate, best (lowest MAE) first
+    def run(self, df, graph_features_df):
+
+        # A single feature matrix for the whole search, rows ordered by date
+        X, y, rows = FeatureMatrixBuilder().build(df, graph_features_df, train_mask(df))
+        dates = df["Date"].to_numpy()[rows]
+        order = np.argsort(dates, kind="stable")
+        X, y, dates = X[order], y[order], dates[order]
+
+        folds = self.folds(dates)
+
+        # The cores are shared between the worker processes: a model fitted
+        # in a worker never starts more threads than its share
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        candidates = self.candidates()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_search_worker,
+                                 initargs=(X, y, folds, threads)) as pool:
+            scores = list(pool.map(_score_candidate, candidates))
+
+        results = pd.DataFrame({
+            "strategy": [name for name, _ in candidates],
+            "params": [json.dumps(params, sort_keys=True) for _, params in candidates],
+            "MAE": [mae for mae, _ in scores],
+            "R2": [r2 for _, r2 in scores],
+        })
+        return results.sort_values(by="MAE", ignore_index=True)
+
+    # Record the best candidate of a search in the model registry
+    @staticmethod
+    def record_winner(results, registry):
+
+        best = results.iloc[0]
+        return registry.record(best["strategy"], json.loads(best["params"]), best["MAE"],
+                               details={"R2": float(best["R2"]), "candidates": len(results)})
+
+
+#==================================#
+# Worker processes                 #
+#==================================#
+
+# Feature matrix, folds and preprocessed folds of a worker process
+_search_data = {}
+
+
+def _init_search_worker(X, y, folds, threads):
+    _search_data["X"] = X
+    _search_data["y"] = y
+    _search_data["folds"] = folds
+    _search_data["preprocessed"] = {}
+
+    # OpenMP (e.g. HistGradientBoosting) and BLAS threads, for the life of the worker
+    _search_data["thread_limits"] = threadpool_limits(limits=threads)
+    _search_data["threads"] = threads
+
+
+# Preprocessed (train, validation) features of a fold, computed once per
+# worker for each distinct preprocessing (e.g. the StandardScaler)
+def _preprocessed_fold(fold_number, preprocessing):
+
+    key = (fold_number, repr(preprocessing))
+    cache = _search_data["preprocessed"]
+
+    if key not in cache:
+        train_end, validation_end = _search_data["folds"][fold_number]
+        X_train = _search_data["X"][:train_end]
+        X_validation = _search_data["X"][train_end:validation_end]
+
+        if preprocessing is not None:
+            fitted = clone(preprocessing).fit(X_train, _search_data["y"][:train_end])
+            X_train, X_validation = fitted.transform(X_train), fitted.transform(X_validation)
+
+        cache[key] = (X_train, X_validation)
+
+    return cache[key]
+
+
+# Mean validation MAE and R2 of one candidate over the folds
+def _score_candidate(candidate):
+
+    name, params = candidate
+    pipeline = StrategyFactory.build_strategy(name, **params).build_pipeline()
+
+    # Every step but the model is shared preprocessing
+    preprocessing = pipeline[:-1] if len(pipeline.steps) > 1 else None
+    model = pipeline.steps[-1][1]
+
+    # joblib threads of the model (e.g. n_jobs=-1 of the tuned forest)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=_search_data["threads"])
+
+    maes, r2s = [], []
+    for fold_number, (train_end, validation_end) in enumerate(_search_data["folds"]):
+        X_train, X_validation = _preprocessed_fold(fold_number, preprocessing)
+        y_train = _search_data["y"][:train_end]
+        y_validation = _search_data["y"][train_end:validation_end]
+
+        y_pred = clone(model).fit(X_train, y_train).predict(X_validation)
+        maes.append(mean_absolute_error(y_validation, y_pred))
+        r2s.append(r2_score(y_validation, y_pred))
+
+    return float(np.mean(maes)), float(np.mean(r2s))
+
+
+def main():
+
+    # Imported here: the service is only needed when running the search from the command line
+    from analysis_service import AnalysisService
+
+    parser = argparse.ArgumentParser(description="Hyperparameter search across strategies")
+    parser.add_argument("--csv", default="stocks_data_2020_2025.csv", help="Stocks csv master file")
+    parser.add_argument("--strategies", nargs="*", choices=sorted(DEFAULT_SPACES), default=sorted(DEFAULT_SPACES))
+    parser.add_argument("--n-iter", type=int, default=None, help="Random candidates per strategy (default: full grid)")
+    parser.add_argument("--splits", type=int, default=5, help="Time-ordered CV folds")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    service = AnalysisService(args.csv)
+    service.load_data()
+    service.build_features()
+
+    search = ParameterSearch({name: DEFAULT_SPACES[name] for name in args.strategies},
+                             n_iter=args.n_iter, n_splits=args.splits, workers=args.workers)
+    results = search.run(service.df, service.graph_features_df)
+    print(results.to_string(index=False))
+
+    entry = ParameterSearch.record_winner(results, ModelRegistry())
+    print(f"\nWinner: {entry['strategy']} {entry['params']} (MAE {entry['score']:.4f}), recorded in the model registry")
+
+
+if __name__ == "__main__":
+    main()
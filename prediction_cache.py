@@ -0,0 +1,82 @@
+# Prediction Cache Module
+# Keeps the (dates, real values, predicted values, mae) results of recent
+# predictions, so selecting a ticker again does not filter and predict again.
+# Entries are keyed by the ticker, the data version and the model version:
+# after a data refresh or a retrain the old keys are simply never asked for
+# again. Least recently used entries are dropped past max_entries, or spilled
+# to a persistent ArtifactCache when one is given
+
+import threading
+from collections import OrderedDict
+
+from artifact_cache import ArtifactCache
+
+
+class PredictionCache:
+
+    # Constructor
+    # spill: ArtifactCache receiving the entries evicted from memory (None: dropped)
+    def __init__(self, max_entries=128, spill=None):
+        self.base_entries = max_entries # Configured size, before any reserve()
+        self.max_entries = max_entries
+        self.spill = spill
+        self._entries = OrderedDict() # Key -> result, least recently used first
+        self._lock = threading.Lock()
+
+    # Key of the prediction of a ticker by a given model on a given data version
+    @staticmethod
+    def make_key(ticker, data_version, model_version):
+        return ArtifactCache.make_key("prediction", ticker, data_version, model_version)
+
+    # Cached result for the key, or None on a miss
+    def get(self, key):
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self.spill is None:
+            return None
+
+        # Entries read back from the disk become recent again
+        result = self.spill.get(key)
+        if result is not None:
+            self.put(key, result)
+        return result
+
+    def put(self, key, result):
+
+        evicted = []
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+
+        # Written outside the lock: the disk is slow
+        if self.spill is not None:
+            for old_key, old_result in evicted:
+                self.spill.put(old_key, old_result)
+
+    # Whether a result is cached for the key, in memory or spilled to the disk
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.spill is not None and key in self.spill
+
+    # Keep at least entries results in memory (e.g. one per ticker before
+    # predicting the whole universe), so they are not evicted right away
+    def reserve(self, entries):
+        with self._lock:
+            self.max_entries = max(self.max_entries, entries)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # Drop every in-memory entry (e.g. after a retrain, to free the memory sooner)
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,183 @@
+# view/prediction_chart.py
+
+# Persistent chart of the prediction results: a single matplotlib Figure and
+# Tk canvas are created once, and each new prediction only replaces the line
+# data. When the axes limits still fit, the lines are redrawn over a cached
+# background (blitting) instead of redrawing the whole figure. Long series
+# are downsampled (LTTB) so the memory and drawing cost stay bounded
+
+import numpy as np
+
+# Use to implement the matplotlib graph into the GUI interface
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+# Figure instead of pyplot: pyplot keeps every figure alive in its global registry
+from matplotlib.figure import Figure
+
+import matplotlib.dates as mdates
+
+
+# Largest-Triangle-Three-Buckets downsampling: positions of at most
+# threshold points of (x, y) that keep the visual shape of the series
+def lttb(x, y, threshold):
+
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    # First and last points are always kept, the others are split in buckets
+    edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+
+        # Average point of the next bucket (the last point for the last bucket)
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x, next_y = x[next_start:next_stop].mean(), y[next_start:next_stop].mean()
+
+        # Point of the bucket forming the largest triangle with its neighbours
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous]) -
+                      (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        keep[bucket + 1] = previous
+
+    return keep
+
+
+class PredictionChart:
+
+    # Constructor
+    # max_points: points drawn per line at most (longer series are downsampled)
+    def __init__(self, master, max_points=1000):
+
+        self.max_points = max_points
+
+        # Create matplotlib figure
+        self.figure = Figure(figsize=(8, 3))
+        self.ax = self.figure.add_subplot()
+
+        # Adding outer and inner background color to the graphs
+        self.figure.patch.set_facecolor("palegreen")
+        self.ax.set_facecolor("azure")
+
+        # Lines and title are animated: they are drawn over the cached background
+        self.real_line, = self.ax.plot([], [], label="Real Values (2025)", color="crimson", animated=True)
+        self.predicted_line, = self.ax.plot([], [], label="Predicted", color="mediumblue", animated=True)
+        self.title = self.ax.set_title("", fontweight="bold")
+        self.title.set_animated(True)
+
+        # One more line per strategy in the model comparisons (created on first use)
+        self.model_lines = {}
+
+        self.figure.subplots_adjust(bottom=0.2)
+
+        # Added gridlines
+        self.ax.grid(True, linestyle="--", alpha=0.5, color="black")
+
+        self.ax.set_xlabel("Date", fontsize=12, fontweight="bold")
+        self.ax.set_ylabel("Close Price $", fontsize=12, fontweight="bold")
+        self.ax.xaxis_date()
+        self._legend([self.real_line, self.predicted_line]) # Adds legend
+
+        # Embed graph in Tkinter
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.background = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+        # Avoid stretching of the graph
+        widget = self.canvas.get_tk_widget()
+        widget.pack(pady=10)
+        widget.configure(width=1100, height=300)
+
+    # Replace the plotted series with a new prediction
+    def show(self, ticker, dates, real_values, predicted_values):
+        self._show(f"Prediction Results for {ticker}", dates,
+                   [(self.real_line, real_values), (self.predicted_line, predicted_values)])
+
+    # Replace the plotted series with the predictions of several models
+    # predictions: {strategy name: predicted values}, one line per strategy
+    def show_comparison(self, ticker, dates, real_values, predictions):
+        self._show(f"Model Comparison for {ticker}", dates,
+                   [(self.real_line, real_values)] +
+                   [(self._model_line(name), values) for name, values in predictions.items()])
+
+    # Line of a strategy in the comparisons
+    def _model_line(self, name):
+        if name not in self.model_lines:
+            self.model_lines[name], = self.ax.plot([], [], label=name, linestyle="--", animated=True)
+        return self.model_lines[name]
+
+    # Plot the (line, values) pairs and hide the other lines
+    def _show(self, title, dates, series):
+
+        x = mdates.date2num(np.asarray(dates, dtype="datetime64[ns]"))
+        values = []
+        for line, line_values in series:
+            y = np.asarray(line_values, dtype=float)
+            keep = lttb(x, y, self.max_points)
+            line.set_data(x[keep], y[keep])
+            values.append(y)
+
+        self.title.set_text(title)
+
+        # The legend (part of the cached background) follows the visible lines
+        shown = [line for line, _ in series]
+        changed = False
+        for line in self._lines():
+            visible = any(line is other for other in shown)
+            if line.get_visible() != visible:
+                line.set_visible(visible)
+                changed = True
+        if changed:
+            self._legend(shown)
+
+        # Full redraw only when the axes must be rescaled, the legend changed
+        # (or nothing was drawn yet)
+        if self._rescale(x, np.concatenate(values)) or changed or self.background is None:
+            self.canvas.draw()
+        else:
+            self._blit()
+
+    def _lines(self):
+        return [self.real_line, self.predicted_line, *self.model_lines.values()]
+
+    def _legend(self, lines):
+        self.ax.legend(handles=lines, facecolor="springgreen", edgecolor="red")
+
+    # Fit the axes to the new data, return True when the limits changed
+    def _rescale(self, x, y):
+
+        if len(x) == 0:
+            return False
+
+        x_min, x_max = x.min(), x.max()
+        y_min, y_max = np.nanmin(y), np.nanmax(y)
+        y_pad = (y_max - y_min) * 0.05 or 1.0
+
+        # The current limits are kept while the data fits and fills at least half of them
+        (view_x_min, view_x_max), (view_y_min, view_y_max) = self.ax.get_xlim(), self.ax.get_ylim()
+        if view_x_min == x_min and view_x_max == x_max and view_y_min <= y_min and y_max <= view_y_max \
+                and (y_max - y_min) >= 0.5 * (view_y_max - view_y_min):
+            return False
+
+        self.ax.set_xlim(x_min, x_max)
+        self.ax.set_ylim(y_min - y_pad, y_max + y_pad)
+        return True
+
+    # After a full redraw: cache the static background and draw the animated artists on it
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    # Redraw only the lines and the title over the cached background
+    def _blit(self):
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.figure.bbox)
+
+    def _draw_animated(self):
+        for artist in (*self._lines(), self.title):
+            self.figure.draw_artist(artist)
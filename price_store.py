@@ -0,0 +1,462 @@
+# Columnar Price Store Module
+# Converts the csv master file into a binary layout: one raw typed file per
+# column, sorted by (Ticker, Date) so the rows of each ticker are contiguous.
+# load() returns the memory maps of these files as the frame columns, so
+# nothing is copied or parsed and the pages are only read when touched.
+# Rows appended by an incremental refresh go to small per-ticker partitions
+# until compact() rewrites them into the base files
+
+import hashlib # For the data version
+import json # For the store manifest
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# File describing the columns and partitions of the store
+MANIFEST_FILE = "manifest.json"
+
+# Directory of the base column files
+BASE_PARTITION = "base"
+
+# Bumped whenever the on-disk layout changes so old stores get rebuilt
+STORE_VERSION = 3
+
+# Columns every appended row must have; the other stored columns are filled in
+REQUIRED_COLUMNS = ["Date", "Ticker", "Open", "High", "Low", "Close", "Volume"]
+
+
+class PriceStore:
+
+    # Constructor
+    def __init__(self, store_dir):
+        self.store_dir = store_dir # Directory holding the partitions
+        self.manifest = None # Cached manifest contents
+
+    # Location of the store that belongs to a csv master file
+    @staticmethod
+    def for_csv(path_csv):
+        return PriceStore(os.path.splitext(path_csv)[0] + "_store")
+
+    # Size and modification time identify the version of the csv
+    @staticmethod
+    def source_fingerprint(path_csv):
+        stat = os.stat(path_csv)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    # Method that checks if a store was written to the directory
+    def exists(self):
+        return os.path.isfile(os.path.join(self.store_dir, MANIFEST_FILE))
+
+    # Read (once, unless reload is asked) the manifest of the store
+    def read_manifest(self, reload=False):
+        if self.manifest is None or reload:
+            with open(os.path.join(self.store_dir, MANIFEST_FILE)) as manifest_file:
+                self.manifest = json.load(manifest_file)
+        return self.manifest
+
+    # Version of the stored data: the digest of the column contents taken
+    # when they were written (and chained with every append), so rewriting
+    # the same rows, e.g. after touching the csv, keeps the same version.
+    # Stores written before the digest existed fall back to the manifest hash
+    def fingerprint(self):
+        manifest = self.read_manifest()
+        if manifest.get("digest"):
+            return manifest["digest"]
+        return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+    # The store is fresh when it was built from the current csv.
+    # A store with no csv next to it is used as it is
+    def is_fresh(self, path_csv):
+        if not self.exists():
+            return False
+
+        # Another process (e.g. an incremental refresh) may have updated the store
+        manifest = self.read_manifest(reload=True)
+        if manifest.get("version") != STORE_VERSION:
+            return False
+
+        if not os.path.exists(path_csv):
+            return True
+
+        return manifest.get("source") == PriceStore.source_fingerprint(path_csv)
+
+    # Parse the csv (the slow path) and write it as a store
+    def build_from_csv(self, path_csv):
+
+        # Fingerprint taken before reading, a csv modified meanwhile triggers another build
+        source = PriceStore.source_fingerprint(path_csv)
+
+        df = pd.read_csv(path_csv)
+        # Converting dates to datetime format
+        df["Date"] = pd.to_datetime(df["Date"])
+        df = df.dropna(subset=["Date"]) # Filtered rows with invalid data
+        source_last_dates = PriceStore._last_dates(df)
+
+        # Days appended by an incremental refresh are only in the store:
+        # they are carried over instead of being dropped with the old store
+        appended = self._appended_rows(source_last_dates)
+        if len(appended):
+            print(f"Keeping {len(appended)} rows of {appended['Ticker'].nunique()} tickers "
+                  f"appended to {self.store_dir} after the csv was written")
+            df = pd.concat([df, appended], ignore_index=True)
+
+        self.write(df, source, source_last_dates)
+
+    # Stored rows that append() added after the csv the store was built from,
+    # and that are also later than the new csv (source_last_dates: last date
+    # of each of its tickers). Tickers the new csv does not have are dropped
+    # with their rows, and a store not built from a csv has nothing to keep
+    def _appended_rows(self, source_last_dates):
+
+        if not self.exists() or self.read_manifest(reload=True).get("version") != STORE_VERSION:
+            return pd.DataFrame()
+
+        manifest = self.read_manifest()
+        pieces, first_dates = [], {}
+        for ticker, entry in manifest["tickers"].items():
+            if ticker not in source_last_dates or entry.get("source_last_date") is None:
+                continue
+            first_dates[ticker] = max(pd.Timestamp(entry["source_last_date"]), source_last_dates[ticker])
+            if pd.Timestamp(entry["last_date"]) > first_dates[ticker]:
+                pieces.append((ticker, 0, entry["rows"]))
+        if not pieces:
+            return pd.DataFrame()
+
+        stored = self._load_pieces(pieces, [ticker for ticker, _, _ in pieces])
+        stored["Ticker"] = stored["Ticker"].astype(str)
+        after = stored["Date"] > stored["Ticker"].map(first_dates)
+        return stored[after.to_numpy()]
+
+    # Write a whole frame, replacing the previous store
+    # source: fingerprint of the csv df was read from (None when there is no csv)
+    # source_last_dates: last date of each ticker in that csv (default: the
+    #                    last dates of df), rows after it were appended later
+    # digest: digest of the contents when known (compact() rewrites the same rows)
+    def write(self, df, source=None, source_last_dates=None, digest=None):
+
+        df = PriceStore._naive_dates(df)
+        if source_last_dates is None and source is not None:
+            source_last_dates = PriceStore._last_dates(df)
+        source_last_dates = source_last_dates or {}
+        columns = PriceStore._column_types(df)
+        # Plain text tickers, so the rows follow the sorted ticker names
+        df = df.assign(Ticker=df["Ticker"].astype(str)).sort_values(by=["Ticker", "Date"], kind="stable")
+
+        # Build next to the final directory and swap it in at the end
+        tmp_dir = f"{self.store_dir}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        # One file per column: the rows of each ticker are a contiguous range
+        PriceStore._write_partition(os.path.join(tmp_dir, BASE_PARTITION), df, columns)
+
+        names, starts, counts = np.unique(df["Ticker"].to_numpy(), return_index=True, return_counts=True)
+        dates = df["Date"].to_numpy()
+        tickers = {}
+        for ticker, start, rows in zip(names, starts, counts):
+            tickers[str(ticker)] = {
+                "start": int(start), # First row in the base files
+                "base_rows": int(rows),
+                "rows": int(rows), # Base rows plus appended rows
+                "partition": None, # Partition of the appended rows
+                "last_date": pd.Timestamp(dates[start + rows - 1]).isoformat(), # Watermark
+                "source_last_date": (source_last_dates[str(ticker)].isoformat()
+                                     if str(ticker) in source_last_dates else None), # Csv watermark
+            }
+
+        manifest = {
+            "version": STORE_VERSION,
+            "source": source,
+            "columns": columns,
+            "base_rows": len(df),
+            "digest": digest or PriceStore._digest(df, columns),
+            "tickers": tickers,
+            "updated": pd.Timestamp.now().isoformat(),
+        }
+        PriceStore._write_manifest(tmp_dir, manifest)
+
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        os.replace(tmp_dir, self.store_dir)
+        self.manifest = manifest
+
+    # Append new rows to the ticker partitions without rewriting the old ones.
+    # Rows at or before a ticker's watermark (last stored date) are ignored.
+    # A ticker gets its own partition for the appended rows on its first append
+    # (unknown tickers too). Returns the number of rows appended
+    def append(self, df):
+
+        manifest = self.read_manifest(reload=True)
+        columns = manifest["columns"]
+        tickers = dict(manifest["tickers"])
+
+        missing = [name for name in REQUIRED_COLUMNS if name not in df.columns]
+        if missing:
+            raise ValueError("Missing columns: " + ", ".join(missing))
+
+        # Optional columns a source left out (e.g. no dividends in the range):
+        # NaN for decimals, 0 for counts
+        df = df.assign(**{name: (np.nan if np.dtype(dtype).kind == "f" else 0)
+                          for name, dtype in columns.items() if name not in df.columns})
+
+        df = PriceStore._naive_dates(df).sort_values(by=["Ticker", "Date"], kind="stable")
+
+        # Partitions are numbered in creation order
+        partitions = sum(1 for entry in tickers.values() if entry["partition"])
+
+        # The new rows are chained onto the digest of the stored ones
+        digest = hashlib.blake2b(self.fingerprint().encode(), digest_size=32)
+
+        appended = 0
+        for ticker, part in df.groupby("Ticker", sort=True):
+            ticker = str(ticker)
+            entry = tickers.get(ticker)
+
+            if entry is None:
+                entry = {"start": 0, "base_rows": 0, "rows": 0, "partition": None, "last_date": None,
+                         "source_last_date": None}
+            else:
+                part = part[part["Date"] > pd.Timestamp(entry["last_date"])]
+
+            if part.empty:
+                continue
+
+            partition = entry["partition"]
+            if partition is None:
+                partition = f"p{partitions:05d}"
+                partitions += 1
+
+            path = os.path.join(self.store_dir, partition)
+            # Bytes left by an interrupted append are cut before writing
+            PriceStore._truncate_partition(path, columns, entry["rows"] - entry["base_rows"])
+            PriceStore._write_partition(path, part, columns, mode="ab")
+            PriceStore._digest(part.assign(Ticker=ticker), columns, digest)
+
+            tickers[ticker] = dict(entry, partition=partition, rows=entry["rows"] + len(part),
+                                   last_date=part["Date"].iloc[-1].isoformat())
+            appended += len(part)
+
+        # The manifest is replaced last: until then readers see the old rows only
+        if appended:
+            manifest = dict(manifest, digest=digest.hexdigest())
+        manifest = dict(manifest, tickers=dict(sorted(tickers.items())),
+                        updated=pd.Timestamp.now().isoformat())
+        PriceStore._write_manifest(self.store_dir, manifest)
+        self.manifest = manifest
+
+        return appended
+
+    # Last stored date of each ticker
+    def watermarks(self):
+        return {
+            ticker: pd.Timestamp(entry["last_date"])
+            for ticker, entry in self.read_manifest(reload=True)["tickers"].items()
+        }
+
+    # Whether rows were appended since the base files were written
+    def has_appended_rows(self):
+        return any(entry["rows"] != entry["base_rows"] for entry in self.read_manifest()["tickers"].values())
+
+    # Rewrite the appended rows into the base files, so load() maps the whole
+    # store again. Binary to binary: nothing is parsed
+    def compact(self):
+        manifest = self.read_manifest(reload=True)
+        tickers = list(manifest["tickers"])
+        df = self._load_pieces([(ticker, 0, manifest["tickers"][ticker]["rows"]) for ticker in tickers], tickers)
+        # The appended rows stay marked as appended after the csv
+        self.write(df, manifest.get("source"), {
+            ticker: pd.Timestamp(entry["source_last_date"])
+            for ticker, entry in manifest["tickers"].items() if entry.get("source_last_date")},
+            digest=self.fingerprint())
+
+    # Frame of the whole store sorted by (Ticker, Date)
+    # columns: only load these columns (default: all of them)
+    # The columns are the read-only memory maps of the base files (pandas
+    # copies a column only when it is written to), so the resident memory
+    # only grows with the pages actually read. The Ticker codes are the one
+    # array built in memory. Appended rows not compacted yet are copied
+    # together with the base rows instead
+    def load(self, columns=None):
+
+        manifest = self.read_manifest()
+        tickers = list(manifest["tickers"])
+
+        if self.has_appended_rows():
+            return self._load_pieces([(ticker, 0, manifest["tickers"][ticker]["rows"]) for ticker in tickers],
+                                     tickers, columns)
+
+        data = {name: self._map_base(name) for name in self._column_names(columns)}
+        counts = [manifest["tickers"][ticker]["rows"] for ticker in tickers]
+        return PriceStore._frame(data, tickers, counts, tickers)
+
+    # Iterate over the store in frames of about chunk_rows rows, ticker by
+    # ticker and in (Ticker, Date) order, so only one chunk is in memory at a
+    # time. Whole tickers are grouped until the chunk is full, and a ticker
+    # larger than a chunk is split in date ranges, each read straight from its
+    # row range of the column files. Every chunk has the same Ticker
+    # categories as load()
+    def iter_chunks(self, chunk_rows=500_000, columns=None):
+
+        manifest = self.read_manifest()
+        tickers = list(manifest["tickers"])
+
+        group, group_rows = [], 0
+        for ticker in tickers:
+            rows = manifest["tickers"][ticker]["rows"]
+
+            if rows > chunk_rows:
+                # Flush the pending group first to keep the (Ticker, Date) order
+                if group:
+                    yield self._load_pieces(group, tickers, columns)
+                    group, group_rows = [], 0
+                for start in range(0, rows, chunk_rows):
+                    yield self._load_pieces([(ticker, start, min(rows, start + chunk_rows))], tickers, columns)
+                continue
+
+            if group and group_rows + rows > chunk_rows:
+                yield self._load_pieces(group, tickers, columns)
+                group, group_rows = [], 0
+            group.append((ticker, 0, rows))
+            group_rows += rows
+
+        if group:
+            yield self._load_pieces(group, tickers, columns)
+
+    # Typed frame (a copy) of pieces of tickers: (ticker, first row, last row + 1)
+    # in the ticker's own row numbering, with a categorical Ticker over categories
+    def _load_pieces(self, pieces, categories, columns=None):
+
+        manifest = self.read_manifest()
+        counts = np.array([stop - start for _, start, stop in pieces], dtype=np.int64)
+
+        data = {}
+        for name in self._column_names(columns):
+            base = self._map_base(name)
+            column = np.empty(int(counts.sum()), dtype=manifest["columns"][name])
+            position = 0
+            for ticker, start, stop in pieces:
+                entry = manifest["tickers"][ticker]
+                base_rows = entry["base_rows"]
+
+                # Base rows first, then the appended ones
+                if start < base_rows:
+                    rows = min(stop, base_rows) - start
+                    column[position:position + rows] = base[entry["start"] + start:entry["start"] + start + rows]
+                    position += rows
+                if stop > base_rows:
+                    rows = stop - max(start, base_rows)
+                    appended = self._map_appended(ticker, name)
+                    column[position:position + rows] = appended[max(start, base_rows) - base_rows:stop - base_rows]
+                    position += rows
+            data[name] = column
+
+        return PriceStore._frame(data, [ticker for ticker, _, _ in pieces], counts, categories)
+
+    # Stored columns, in order, restricted to columns when given
+    def _column_names(self, columns=None):
+        return [name for name in self.read_manifest()["columns"] if columns is None or name in columns]
+
+    # Memory-map one base column file (no copy, no parsing)
+    def _map_base(self, name):
+
+        manifest = self.read_manifest()
+        dtype = np.dtype(manifest["columns"][name])
+        if manifest["base_rows"] == 0:
+            return np.empty(0, dtype=dtype)
+
+        # Only the rows recorded in the manifest are mapped
+        path = os.path.join(self.store_dir, BASE_PARTITION, name + ".bin")
+        return np.memmap(path, dtype=dtype, mode="r", shape=(manifest["base_rows"],))
+
+    # Memory-map one column of the rows appended to a ticker
+    def _map_appended(self, ticker, name):
+
+        manifest = self.read_manifest()
+        entry = manifest["tickers"][ticker]
+        path = os.path.join(self.store_dir, entry["partition"], name + ".bin")
+        return np.memmap(path, dtype=manifest["columns"][name], mode="r",
+                         shape=(entry["rows"] - entry["base_rows"],))
+
+    # Frame of the given columns, with the Ticker categorical built straight
+    # from the row count of each ticker (in order) over categories
+    @staticmethod
+    def _frame(data, tickers, counts, categories):
+
+        category_codes = {ticker: code for code, ticker in enumerate(categories)}
+        codes = np.repeat(np.array([category_codes[t] for t in tickers], dtype=np.int32), counts)
+        df = pd.DataFrame(data, copy=False)
+        df.insert(1 if "Date" in data else 0, "Ticker", pd.Categorical.from_codes(codes, categories=categories))
+        return df
+
+    # Last date of each ticker of a frame, {ticker: Timestamp}
+    @staticmethod
+    def _last_dates(df):
+        df = PriceStore._naive_dates(df)
+        return df.groupby(df["Ticker"].astype(str))["Date"].max().to_dict()
+
+    # Digest of the rows of a frame sorted by ticker: the tickers with their
+    # row counts, then the stored columns as written.
+    # digest: running blake2b hash to update (a new one by default)
+    @staticmethod
+    def _digest(df, columns, digest=None):
+
+        digest = digest or hashlib.blake2b(digest_size=32)
+        tickers = df["Ticker"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, tickers[1:] != tickers[:-1]]) if len(tickers) else []
+        counts = np.diff(np.r_[starts, len(tickers)])
+        digest.update(json.dumps([[str(tickers[start]), int(count)]
+                                  for start, count in zip(starts, counts)]).encode())
+        for name, dtype in columns.items():
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(df[name].to_numpy(dtype=dtype)).view(np.uint8))
+        return digest.hexdigest()
+
+    # Timezone-aware dates are stored as naive wall times
+    @staticmethod
+    def _naive_dates(df):
+        if getattr(df["Date"].dt, "tz", None) is not None:
+            df = df.assign(Date=df["Date"].dt.tz_localize(None))
+        return df
+
+    # Write the manifest through a temporary file so it is replaced atomically
+    @staticmethod
+    def _write_manifest(store_dir, manifest):
+        tmp_path = os.path.join(store_dir, f"{MANIFEST_FILE}.tmp{os.getpid()}")
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(tmp_path, os.path.join(store_dir, MANIFEST_FILE))
+
+    # Storage type of each column: dates as datetime64[ns], numbers as they are
+    @staticmethod
+    def _column_types(df):
+
+        columns = {"Date": np.dtype("datetime64[ns]").str}
+        for name in df.columns:
+            if name in ("Date", "Ticker"):
+                continue
+            # Text columns other than the ticker are not used by the application
+            if pd.api.types.is_numeric_dtype(df[name]):
+                columns[name] = df[name].to_numpy().dtype.str
+
+        return columns
+
+    # Write each column of a partition to its own raw binary file
+    @staticmethod
+    def _write_partition(path, part, columns, mode="wb"):
+
+        os.makedirs(path, exist_ok=True)
+        for name, dtype in columns.items():
+            values = np.ascontiguousarray(part[name].to_numpy(dtype=dtype))
+            with open(os.path.join(path, name + ".bin"), mode) as column_file:
+                values.tofile(column_file)
+
+    # Cut the column files of a partition back to the rows in the manifest
+    @staticmethod
+    def _truncate_partition(path, columns, rows):
+
+        for name, dtype in columns.items():
+            column_path = os.path.join(path, name + ".bin")
+            size = rows * np.dtype(dtype).itemsize
+            if os.path.exists(column_path) and os.path.getsize(column_path) > size:
+                os.truncate(column_path, size)
@@ -0,0 +1,147 @@
+# Rolling Correlation Module
+# Keeps the running sums (count, sum x, sum x^2, sum xy) of every ticker pair,
+# so the correlation matrix is updated in O(N^2) per new bar instead of
+# pivoting and correlating the whole history again (O(T * N^2)).
+# With a window, the oldest bar leaves the sums when a new one arrives,
+# which gives time-windowed correlations (e.g. a 60-day regime)
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class RollingCorrelation:
+
+    # Constructor
+    # tickers: fixed set of tickers (columns of the matrix)
+    # window: number of bars in the correlation, None = all the history
+    def __init__(self, tickers, window=None):
+        self.tickers = list(tickers)
+        self.window = window
+        self.last_date = None # Date of the latest bar included
+
+        size = len(self.tickers)
+        # Pairwise sums over the bars where both tickers have a price.
+        # sum_x[i, j] holds the sum of x_i over the bars where x_j also exists
+        self.count = np.zeros((size, size))
+        self.sum_x = np.zeros((size, size))
+        self.sum_xx = np.zeros((size, size))
+        self.sum_xy = np.zeros((size, size))
+
+        # Prices are shifted by a reference value per ticker (correlation does
+        # not change) to avoid cancellation errors in the sums
+        self.shift = None
+
+        # Bars inside the window, needed to remove them later
+        self.bars = deque()
+        self.updates_since_refresh = 0
+
+    # Engine initialised from a long frame (Date, Ticker, Close) in one pass
+    @classmethod
+    def from_frame(cls, df, window=None, column="Close"):
+
+        # Pivot table: each column becomes a ticker, aligned by date
+        pivot = df.pivot(index="Date", columns="Ticker", values=column)
+        if window:
+            pivot = pivot.tail(window)
+
+        engine = cls(pivot.columns, window)
+        values = pivot.to_numpy(dtype=float)
+        if len(values) == 0:
+            return engine
+
+        engine.shift = engine._first_valid(values)
+        engine._add_block(values - engine.shift, 1.0)
+
+        if window:
+            engine.bars.extend(values - engine.shift)
+        engine.last_date = pivot.index[-1]
+        return engine
+
+    # Add one bar (prices ordered like self.tickers, NaN when missing)
+    def update(self, date, values):
+
+        values = np.asarray(values, dtype=float)
+        if self.shift is None:
+            self.shift = np.where(np.isnan(values), 0.0, values)
+
+        bar = values - self.shift
+        self._add_block(bar[np.newaxis, :], 1.0)
+
+        if self.window:
+            self.bars.append(bar)
+            if len(self.bars) > self.window:
+                self._add_block(self.bars.popleft()[np.newaxis, :], -1.0)
+
+            # Adding and removing bars slowly accumulates rounding errors,
+            # the sums are recomputed exactly once per window
+            self.updates_since_refresh += 1
+            if self.updates_since_refresh >= self.window:
+                self._refresh()
+
+        self.last_date = date
+
+    # Add the bars of a long frame that are newer than the last included date
+    def extend(self, df, column="Close"):
+
+        new_rows = df if self.last_date is None else df[df["Date"] > self.last_date]
+        if new_rows.empty:
+            return 0
+
+        pivot = new_rows.pivot(index="Date", columns="Ticker", values=column)
+        pivot = pivot.reindex(columns=self.tickers)
+
+        for date, values in zip(pivot.index, pivot.to_numpy(dtype=float)):
+            self.update(date, values)
+        return len(pivot)
+
+    # Current correlation matrix (same values as pivot.corr() on the window)
+    def matrix(self):
+
+        n = self.count
+        sum_x, sum_y = self.sum_x, self.sum_x.T
+        sum_xx, sum_yy = self.sum_xx, self.sum_xx.T
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = n * self.sum_xy - sum_x * sum_y
+            variance_x = n * sum_xx - sum_x ** 2
+            variance_y = n * sum_yy - sum_y ** 2
+            correlated = covariance / np.sqrt(variance_x * variance_y)
+
+        # Pairs with fewer than two common bars or a constant price have no correlation
+        correlated[(n < 2) | (variance_x <= 0) | (variance_y <= 0)] = np.nan
+        correlated = np.clip(correlated, -1.0, 1.0)
+
+        return pd.DataFrame(correlated, index=self.tickers, columns=self.tickers)
+
+    # Add (sign=1) or remove (sign=-1) a block of bars (rows) from the sums
+    def _add_block(self, values, sign):
+
+        valid = ~np.isnan(values)
+        mask = valid.astype(float)
+        filled = np.where(valid, values, 0.0)
+
+        self.count += sign * (mask.T @ mask)
+        self.sum_x += sign * (filled.T @ mask)
+        self.sum_xx += sign * ((filled ** 2).T @ mask)
+        self.sum_xy += sign * (filled.T @ filled)
+
+    # Recompute the sums from the bars in the window
+    def _refresh(self):
+
+        for sums in (self.count, self.sum_x, self.sum_xx, self.sum_xy):
+            sums.fill(0.0)
+
+        if self.bars:
+            self._add_block(np.vstack(self.bars), 1.0)
+        self.updates_since_refresh = 0
+
+    # First price of each ticker (0 for tickers without prices)
+    @staticmethod
+    def _first_valid(values):
+
+        valid = ~np.isnan(values)
+        first = np.argmax(valid, axis=0)
+        shift = values[first, np.arange(values.shape[1])]
+        return np.where(valid.any(axis=0), shift, 0.0)
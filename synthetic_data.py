@@ -0,0 +1,72 @@
+# Synthetic Data Module
+# Generates a stock universe in the stocks_data_2020_2025.csv schema with a
+# configurable number of tickers and length of history. Returns are driven
+# by a few sector factors plus noise, so the correlation graph has a
+# realistic community structure, and the history always ends in May 2025 so
+# the 2025 prediction window is covered
+#
+# Usage: python synthetic_data.py --tickers 500 --days 1300 --out synthetic_500.csv
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Columns of the csv master file, in order
+CSV_COLUMNS = ["Ticker", "Date", "Open", "High", "Low", "Close", "Volume", "Adj Close"]
+
+
+# Daily OHLCV rows of tickers over the days business days ending on end
+def synthetic_universe(tickers, days, sectors=8, end="2025-05-30", seed=0):
+
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=days)
+
+    # Sector factor returns shared by the tickers of a sector
+    factors = rng.normal(0, 0.01, size=(days, sectors))
+    sector_of = rng.integers(0, sectors, size=tickers)
+    loadings = rng.uniform(0.5, 1.5, size=tickers)
+    returns = factors[:, sector_of] * loadings + rng.normal(0.0003, 0.01, size=(days, tickers))
+
+    # (tickers, days) arrays, flattened ticker by ticker like the csv file
+    close = (rng.uniform(20, 500, size=tickers) * np.exp(np.cumsum(returns, axis=0))).T
+    open_ = close * (1 + rng.normal(0, 0.005, size=close.shape))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, size=close.shape))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, size=close.shape))
+    volume = rng.integers(1_000_000, 50_000_000, size=close.shape)
+
+    return pd.DataFrame({
+        "Ticker": np.repeat([f"T{i:05d}" for i in range(tickers)], days),
+        "Date": np.tile(dates, tickers),
+        "Open": open_.ravel(),
+        "High": high.ravel(),
+        "Low": low.ravel(),
+        "Close": close.ravel(),
+        "Volume": volume.ravel(),
+        "Adj Close": close.ravel(),
+    }, columns=CSV_COLUMNS)
+
+
+# Write a synthetic universe to a csv file with the master file schema
+def write_synthetic_csv(path, tickers, days, sectors=8, end="2025-05-30", seed=0):
+    df = synthetic_universe(tickers, days, sectors, end, seed)
+    df.to_csv(path, index=False, date_format="%Y-%m-%d")
+    return df
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Synthetic stock universe generator")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=1300, help="Business days of history, ending in May 2025")
+    parser.add_argument("--sectors", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_stocks.csv")
+    args = parser.parse_args()
+
+    df = write_synthetic_csv(args.out, args.tickers, args.days, args.sectors, seed=args.seed)
+    print(f"{len(df)} rows ({args.tickers} tickers x {args.days} days) written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
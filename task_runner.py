@@ -0,0 +1,141 @@
+# Task Runner Module
+# Runs the slow work of the application (loading data, building the graph,
+# training, predicting) on a background thread. Results and progress are
+# handed back to the Tk event loop through a queue polled with after(),
+# so the window keeps redrawing while the work runs
+
+import queue
+import threading
+
+
+# Raised inside a task that was replaced by a newer task on its channel
+class TaskCancelled(Exception):
+    pass
+
+
+# Handle given to each running task to report progress and check if it is stale
+class TaskContext:
+
+    # Constructor
+    def __init__(self, runner, channel, generation):
+        self.runner = runner
+        self.channel = channel
+        self.generation = generation
+
+    # A task is cancelled as soon as a newer task is submitted on its channel
+    @property
+    def cancelled(self):
+        return self.runner._generations.get(self.channel) != self.generation
+
+    # Stop the task early (called by the task between steps)
+    def check(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+    # Report progress (fraction between 0 and 1) to the on_progress callback
+    def progress(self, fraction, message):
+        self.runner._events.put(("progress", self, (fraction, message)))
+
+    # Run a function on the Tk thread, e.g. to update a widget mid-task
+    def post(self, function, *args):
+        self.runner._events.put(("post", self, (function, args)))
+
+
+class TaskRunner:
+
+    # Constructor
+    def __init__(self, widget, poll_ms=16):
+        self.widget = widget # Any Tk widget, used to schedule the polling
+        self.poll_ms = poll_ms # 16 ms keeps the window at about 60 fps
+
+        self._tasks = queue.Queue() # Work waiting for the worker thread
+        self._events = queue.Queue() # Results waiting for the Tk thread
+        self._generations = {} # Latest generation submitted on each channel
+        self._callbacks = {} # Callbacks of each pending task
+        self._polling = False
+
+        # Daemon thread: closing the window does not wait for running work
+        self._thread = threading.Thread(target=self._work_loop, name="task-runner", daemon=True)
+        self._thread.start()
+
+    # Submit work(context) on a channel and return its context.
+    # Tasks run one at a time in submission order. A newer task on the same
+    # channel cancels the previous one: it is skipped if it has not started,
+    # and its result is discarded if it is already running
+    def submit(self, channel, work, on_done=None, on_progress=None, on_error=None):
+
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+
+        context = TaskContext(self, channel, generation)
+        self._callbacks[(channel, generation)] = (on_done, on_progress, on_error)
+        self._tasks.put((context, work))
+
+        self._schedule_poll()
+        return context
+
+    # Cancel whatever is pending or running on a channel
+    def cancel(self, channel):
+        if channel in self._generations:
+            self._generations[channel] += 1
+
+    # Loop of the worker thread
+    def _work_loop(self):
+
+        while True:
+            context, work = self._tasks.get()
+
+            # Stale tasks are skipped without running
+            if context.cancelled:
+                self._events.put(("skipped", context, None))
+                continue
+
+            try:
+                result = work(context)
+            except TaskCancelled:
+                self._events.put(("skipped", context, None))
+            except Exception as error:
+                self._events.put(("error", context, error))
+            else:
+                self._events.put(("done", context, result))
+
+    # Poll the event queue only while tasks are pending
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    # Deliver the queued events on the Tk thread
+    def _poll(self):
+
+        while True:
+            try:
+                kind, context, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            key = (context.channel, context.generation)
+            on_done, on_progress, on_error = self._callbacks.get(key, (None, None, None))
+
+            # Finished tasks release their callbacks
+            if kind in ("done", "error", "skipped"):
+                self._callbacks.pop(key, None)
+
+            # Events of cancelled tasks are dropped
+            if context.cancelled:
+                continue
+
+            if kind == "done" and on_done:
+                on_done(payload)
+            elif kind == "error" and on_error:
+                on_error(payload)
+            elif kind == "progress" and on_progress:
+                on_progress(*payload)
+            elif kind == "post":
+                function, args = payload
+                function(*args)
+
+        if self._callbacks:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
@@ -0,0 +1,208 @@
+# Time-Series Features Module
+# Engineered per-ticker features computed between the data load and the
+# model: lagged returns, rolling volatility, moving averages, RSI and volume
+# z-scores. Every rolling window is computed for all tickers at once with
+# cumulative sums over the (Ticker, Date) sorted rows, no Python loop over
+# rows. The features of each ticker are cached (the tickers are grouped in
+# a fixed number of cache entries), and when new dates are appended only
+# those dates (plus the lookback they need) are computed. Cached rows are
+# only reused while a digest of their dates, closes and volumes still matches
+#
+# The price-based features only use the closes before the row's date, so
+# the Close being predicted never leaks into its own features
+
+import hashlib
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from artifact_cache import ArtifactCache
+
+
+class TimeSeriesFeatures:
+
+    # Constructor
+    # cache: ArtifactCache holding the features (None: no caching), best kept
+    #        apart from the cache of the models so they do not evict each other
+    # source: name of the dataset, part of the cache keys
+    # batches: cache entries the tickers are spread over, a ticker always
+    #          being in the same one (so thousands of tickers are a few writes)
+    def __init__(self, lags=(1, 5, 20), volatility_window=20, moving_averages=(10, 50),
+                 rsi_window=14, volume_window=20, cache=None, source="", batches=64):
+
+        self.lags = tuple(lags)
+        self.volatility_window = volatility_window
+        self.moving_averages = tuple(moving_averages)
+        self.rsi_window = rsi_window
+        self.volume_window = volume_window
+        self.cache = cache
+        self.source = source
+        self.batches = batches
+
+        # Rows of history a feature can depend on
+        self.lookback = max(max(self.lags), volatility_window, max(self.moving_averages),
+                            rsi_window, volume_window) + 2
+
+    # Names of the feature columns, in the order they are computed
+    def columns(self):
+        return ([f"return_{lag}" for lag in self.lags] +
+                [f"volatility_{self.volatility_window}"] +
+                [f"ma_ratio_{window}" for window in self.moving_averages] +
+                [f"rsi_{self.rsi_window}", f"volume_z_{self.volume_window}"])
+
+    # Settings of the features, part of their cache keys and of the model keys
+    def params(self):
+        return {"lags": self.lags, "volatility_window": self.volatility_window,
+                "moving_averages": self.moving_averages, "rsi_window": self.rsi_window,
+                "volume_window": self.volume_window}
+
+    # Feature frame aligned with df (sorted by Ticker then Date)
+    # ticker_index: ticker -> (first row, last row + 1), as built by StockDataProcessor
+    def transform(self, df, ticker_index):
+
+        dates = df["Date"].to_numpy()
+        close = df["Close"].to_numpy(dtype=np.float64)
+        volume = df["Volume"].to_numpy(dtype=np.float64)
+
+        values = np.full((len(df), len(self.columns())), np.nan, dtype=np.float32)
+
+        # Cached features of the tickers, one entry per batch: {ticker: features}
+        entries = {}
+        if self.cache:
+            for batch in {self._batch(ticker) for ticker in ticker_index}:
+                entries[batch] = self.cache.get(self._key(batch)) or {}
+
+        # Reuse the cached rows of each ticker, collect the rows still to compute
+        pending = [] # (ticker, first row, last row + 1, first row to keep)
+        for ticker, (start, stop) in ticker_index.items():
+            entry = entries[self._batch(ticker)].get(ticker) if self.cache else None
+            cached = self._reusable_rows(entry, dates[start:stop], close[start:stop], volume[start:stop])
+
+            if cached:
+                values[start:start + cached] = entry["values"][:cached]
+            if cached < stop - start:
+                pending.append((ticker, start, stop, start + cached))
+
+        if pending:
+            # One vectorized pass over every pending segment, each starting
+            # lookback rows before its first new row
+            firsts = [max(start, keep - self.lookback) for _, start, _, keep in pending]
+            lengths = [stop - first for (_, _, stop, _), first in zip(pending, firsts)]
+            rows = np.concatenate([np.arange(first, first + length) for first, length in zip(firsts, lengths)])
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+            computed = self.compute(close[rows], volume[rows], np.repeat(offsets, lengths))
+
+            changed = set()
+            for (ticker, start, stop, keep), first, offset in zip(pending, firsts, offsets):
+                values[keep:stop] = computed[offset + keep - first:offset + stop - first]
+                if self.cache:
+                    batch = self._batch(ticker)
+                    entries[batch][ticker] = {
+                        "rows": stop - start,
+                        "digest": TimeSeriesFeatures._digest(dates[start:stop], close[start:stop],
+                                                             volume[start:stop]),
+                        "values": values[start:stop],
+                    }
+                    changed.add(batch)
+
+            # One write per changed batch, without the tickers no longer in the data
+            for batch in changed:
+                self.cache.put(self._key(batch), {ticker: entry for ticker, entry in entries[batch].items()
+                                                  if ticker in ticker_index})
+
+        return pd.DataFrame(values, columns=self.columns(), index=df.index)
+
+    # Features of concatenated per-ticker segments
+    # group_first: for each row, the position of the first row of its segment
+    def compute(self, close, volume, group_first):
+
+        features = []
+
+        # Close of the previous day: today's close is the prediction target
+        previous = TimeSeriesFeatures._shift(close, 1, group_first)
+
+        for lag in self.lags:
+            features.append(previous / TimeSeriesFeatures._shift(close, lag + 1, group_first) - 1)
+
+        # Volatility: standard deviation of the daily returns up to yesterday
+        daily = previous / TimeSeriesFeatures._shift(close, 2, group_first) - 1
+        mean = TimeSeriesFeatures._rolling_mean(daily, self.volatility_window, group_first + 2)
+        mean_square = TimeSeriesFeatures._rolling_mean(daily * daily, self.volatility_window, group_first + 2)
+        window = self.volatility_window
+        features.append(np.sqrt(np.maximum(mean_square - mean * mean, 0) * window / (window - 1)))
+
+        for window in self.moving_averages:
+            features.append(previous / TimeSeriesFeatures._rolling_mean(previous, window, group_first + 1) - 1)
+
+        # RSI on the simple averages of the gains and losses up to yesterday
+        change = previous - TimeSeriesFeatures._shift(close, 2, group_first)
+        gain = TimeSeriesFeatures._rolling_mean(np.maximum(change, 0), self.rsi_window, group_first + 2)
+        loss = TimeSeriesFeatures._rolling_mean(np.maximum(-change, 0), self.rsi_window, group_first + 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+        features.append(np.where(np.isnan(gain), np.nan, rsi))
+
+        # Volume z-score of the day against its rolling window
+        mean = TimeSeriesFeatures._rolling_mean(volume, self.volume_window, group_first)
+        mean_square = TimeSeriesFeatures._rolling_mean(volume * volume, self.volume_window, group_first)
+        std = np.sqrt(np.maximum(mean_square - mean * mean, 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            features.append(np.where(std > 0, (volume - mean) / std, np.where(np.isnan(std), np.nan, 0.0)))
+
+        return np.column_stack(features).astype(np.float32)
+
+    # Number of leading rows of a ticker whose cached features are still valid
+    # (0 when any cached row no longer matches the data, e.g. a revised close)
+    @staticmethod
+    def _reusable_rows(entry, dates, close, volume):
+
+        if entry is None:
+            return 0
+
+        rows = entry["rows"]
+        if rows > len(dates) or \
+                TimeSeriesFeatures._digest(dates[:rows], close[:rows], volume[:rows]) != entry["digest"]:
+            return 0
+        return rows
+
+    # Digest of the inputs of a ticker's features
+    @staticmethod
+    def _digest(dates, close, volume):
+        digest = hashlib.blake2b(digest_size=16)
+        for values in (dates, close, volume):
+            digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.hexdigest()
+
+    # Cache entry holding a ticker (stable across runs, unlike hash())
+    def _batch(self, ticker):
+        return zlib.crc32(str(ticker).encode()) % self.batches
+
+    def _key(self, batch):
+        return ArtifactCache.make_key("time_series_features", self.source, batch, self.batches, self.params())
+
+    # Value lag rows earlier in the same segment (NaN before the segment start)
+    @staticmethod
+    def _shift(values, lag, group_first):
+
+        position = np.arange(len(values))
+        shifted = np.full(len(values), np.nan)
+        source = position - lag
+        valid = source >= group_first
+        shifted[valid] = values[source[valid]]
+        return shifted
+
+    # Mean of the window rows ending at each row, NaN unless the whole window
+    # lies at or after valid_first (the first row with a defined value)
+    @staticmethod
+    def _rolling_mean(values, window, valid_first):
+
+        position = np.arange(len(values))
+        sums = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values))))
+
+        start = position - window + 1
+        valid = start >= valid_first
+        mean = np.full(len(values), np.nan)
+        mean[valid] = (sums[position[valid] + 1] - sums[start[valid]]) / window
+        return mean